@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+import argparse
+import collections
+import io
+import itertools
+import json
+import random
+import threading
+import time
+import zipfile
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+# One of the system-generated A records UltraDNS creates for web forwards
+WEB_FORWARD_IP = "204.74.99.100"
+
+class MockAccount:
+    """A synthetic UltraDNS account with deterministic zone contents.
+
+    Every 20th zone is SECONDARY and every 20th (offset by one) is ALIAS, the
+    rest are PRIMARY. A poison_rate fraction of the zones makes any export
+    task that contains them fail.
+    """
+
+    def __init__(self, zone_count, records_per_zone=20, poison_rate=0.0, seed=0):
+        self.zone_count = zone_count
+        self.records_per_zone = records_per_zone
+        self.seed = seed
+        rng = random.Random(seed)
+        self.poisoned = {index for index in range(zone_count) if rng.random() < poison_rate}
+
+    def zone_name(self, index):
+        return f"zone{index:06d}.example."
+
+    def zone_index(self, zone_name):
+        try:
+            index = int(zone_name.rstrip('.').split('.')[0][4:])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.zone_count and zone_name.rstrip('.') == self.zone_name(index).rstrip('.') else None
+
+    def zone_type(self, index):
+        return {18: "SECONDARY", 19: "ALIAS"}.get(index % 20, "PRIMARY")
+
+    def properties(self, index):
+        return {
+            "name": self.zone_name(index),
+            "accountName": "bench",
+            "type": self.zone_type(index),
+            "dnssecStatus": "UNSIGNED",
+            "status": "ACTIVE",
+            "owner": "bench",
+            "resourceRecordCount": self.records_per_zone,
+            "lastModifiedDateTime": "2024-01-01T00:00:00Z"
+        }
+
+    def listing(self, index):
+        zone = {"properties": self.properties(index)}
+        if self.zone_type(index) == "ALIAS":
+            zone["originalZoneName"] = self.zone_name(0)
+        return zone
+
+    def rrsets(self, index):
+        name = self.zone_name(index)
+        rng = random.Random(self.seed * 1000003 + index)
+        rrsets = [
+            {"ownerName": name, "rrtype": "SOA (6)", "ttl": 86400,
+             "rdata": [f"ns1.example. hostmaster.example. {2024010100 + index} 10800 3600 604800 300"]},
+            {"ownerName": name, "rrtype": "NS (2)", "ttl": 86400, "rdata": ["ns1.example.", "ns2.example."]}
+        ]
+        if index % 10 == 0:
+            rrsets.append({"ownerName": name, "rrtype": "A (1)", "ttl": 300, "rdata": [WEB_FORWARD_IP]})
+        for record in range(max(self.records_per_zone - len(rrsets), 0)):
+            owner = f"host{record}.{name}"
+            kind = rng.randrange(6)
+            if kind == 0:
+                rrsets.append({"ownerName": owner, "rrtype": "AAAA (28)", "ttl": 300, "rdata": [f"2001:db8::{record:x}"]})
+            elif kind == 1:
+                rrsets.append({"ownerName": owner, "rrtype": "MX (15)", "ttl": 3600, "rdata": [f"10 mx{rng.randrange(3)}.example."]})
+            elif kind == 2:
+                rrsets.append({"ownerName": owner, "rrtype": "TXT (16)", "ttl": 3600, "rdata": ["v=spf1 include:_spf.example. ~all"]})
+            elif kind == 3:
+                rrsets.append({"ownerName": owner, "rrtype": "CNAME (5)", "ttl": 300, "rdata": [f"host{rng.randrange(self.records_per_zone)}.{name}"]})
+            else:
+                rrsets.append({"ownerName": owner, "rrtype": "A (1)", "ttl": 300, "rdata": [f"192.0.2.{rng.randrange(1, 255)}"]})
+        return rrsets
+
+    def web_forwards(self, index):
+        if index % 10 != 0:
+            return []
+        return [{"requestTo": self.zone_name(index), "defaultRedirectTo": "https://www.example.com/", "defaultForwardType": "HTTP_301_REDIRECT"}]
+
+    def zone_file(self, index):
+        lines = [f"$ORIGIN {self.zone_name(index)}"]
+        for rrset in self.rrsets(index):
+            for rdata in rrset["rdata"]:
+                lines.append(f"{rrset['ownerName']} {rrset['ttl']} IN {rrset['rrtype'].split(' ')[0]} {rdata}")
+        return "\n".join(lines) + "\n"
+
+class RequestStats:
+    """Thread-safe request counts and latencies per endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.latencies = collections.defaultdict(list)
+            self.statuses = collections.Counter()
+            self.bytes_sent = 0
+
+    def record(self, endpoint, status, seconds, size):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[status] += 1
+            self.bytes_sent += size
+
+    def summary(self):
+        with self.lock:
+            endpoints = {endpoint: latency_summary(latencies) for endpoint, latencies in sorted(self.latencies.items())}
+            all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+            return {
+                "requests": len(all_latencies),
+                "bytes_sent": self.bytes_sent,
+                "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+                "latency": latency_summary(all_latencies),
+                "endpoints": endpoints
+            }
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def latency_summary(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+    }
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def handle_request(self, method):
+        started = time.monotonic()
+        server = self.server
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        query = parse_qs(url.query)
+        body = self.rfile.read(int(self.headers.get("content-length", 0) or 0))
+
+        if path == "/_stats":
+            return self.send_json(200, server.stats.summary())
+        if path == "/_reset":
+            server.stats.reset()
+            return self.send_json(200, {})
+
+        if server.latency:
+            time.sleep(server.latency * random.uniform(0.5, 1.5))
+        endpoint = endpoint_name(path)
+        if server.throttle_rate and random.random() < server.throttle_rate:
+            status, headers, payload = 429, {"Retry-After": "1"}, json.dumps([{"errorCode": 429, "errorMessage": "Too many requests"}]).encode()
+        elif server.error_rate and random.random() < server.error_rate:
+            status, headers, payload = 503, {}, json.dumps([{"errorCode": 503, "errorMessage": "Service unavailable"}]).encode()
+        elif path != "/v1/authorization/token" and not server.token_valid(self.headers.get("Authorization", "")):
+            status, headers, payload = 401, {}, json.dumps({"errorCode": 60001, "errorMessage": "invalid_grant:token not valid"}).encode()
+        else:
+            status, headers, payload = server.route(method, path, query, body)
+        self.send(status, headers, payload)
+        server.stats.record(endpoint, status, time.monotonic() - started, len(payload))
+
+    def send_json(self, status, obj):
+        self.send(status, {"Content-Type": "application/json"}, json.dumps(obj).encode())
+
+    def send(self, status, headers, payload):
+        self.send_response(status)
+        headers.setdefault("Content-Type", "application/json")
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class MockServer(ThreadingHTTPServer):
+    """Local stand-in for the UltraDNS endpoints zexport.py uses.
+
+    latency is the mean delay added to every API request, and export tasks
+    take task_time seconds plus task_time_per_zone for every zone they hold.
+    A throttle_rate fraction of requests are answered with HTTP 429 and an
+    error_rate fraction with HTTP 503. With a token_lifetime, access tokens
+    expire that many seconds after they are issued.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, account, port=0, latency=0.02, task_time=0.5, task_time_per_zone=0.002, throttle_rate=0.0, error_rate=0.0, token_lifetime=None):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.account = account
+        self.latency = latency
+        self.task_time = task_time
+        self.task_time_per_zone = task_time_per_zone
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.token_lifetime = token_lifetime
+        self.tokens = {}
+        self.token_ids = itertools.count(1)
+        self.stats = RequestStats()
+        self.tasks = {}
+        self.task_ids = itertools.count(1)
+        self.tasks_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def issue_token(self):
+        token = f"token{next(self.token_ids)}"
+        response = {"accessToken": token, "refreshToken": f"refresh-{token}", "expiresIn": str(self.token_lifetime or 3600)}
+        if self.token_lifetime:
+            self.tokens[token] = time.monotonic() + self.token_lifetime
+        return 200, {}, json.dumps(response).encode()
+
+    def token_valid(self, authorization):
+        """Without a token_lifetime any token is accepted, like the -t tokens the benchmark passes."""
+        if not self.token_lifetime:
+            return True
+        expires = self.tokens.get(authorization.removeprefix("Bearer "))
+        return expires is not None and time.monotonic() < expires
+
+    def route(self, method, path, query, body):
+        """Return (status, headers, payload) for an API request."""
+        parts = path.strip("/").split("/")
+        if method == "POST" and path == "/v1/authorization/token":
+            return self.issue_token()
+        if method == "POST" and path == "/v3/zones/export":
+            return self.create_task(json.loads(body)["zoneNames"])
+        if parts[0] == "tasks" and len(parts) == 2:
+            return self.task_status(parts[1])
+        if parts[0] == "tasks" and len(parts) == 3 and parts[2] == "result":
+            return self.task_result(parts[1])
+        if parts[:2] == ["v3", "zones"] and len(parts) == 2:
+            return self.list_zones(query)
+        if parts[:2] == ["v3", "zones"] and len(parts) in (3, 4):
+            index = self.account.zone_index(parts[2])
+            if index is None:
+                return not_found()
+            if len(parts) == 3:
+                return self.zone_properties(index)
+            if parts[3] == "rrsets":
+                return page(self.account.rrsets(index), "rrSets", query)
+            if parts[3] == "webforwards":
+                web_forwards = self.account.web_forwards(index)
+                return page(web_forwards, "webForwards", query) if web_forwards else not_found()
+        return not_found()
+
+    def list_zones(self, query):
+        limit = int(query.get("limit", ["100"])[0])
+        start = int(query.get("cursor", [""])[0] or 0)
+        end = min(start + limit, self.account.zone_count)
+        response = {
+            "zones": [self.account.listing(index) for index in range(start, end)],
+            "cursorInfo": {"next": str(end)} if end < self.account.zone_count else {},
+            "resultInfo": {"totalCount": self.account.zone_count, "returnedCount": end - start}
+        }
+        return 200, {}, json.dumps(response).encode()
+
+    def zone_properties(self, index):
+        response = self.account.listing(index)
+        if self.account.zone_type(index) == "SECONDARY":
+            response["primaryNameServers"] = {"nameServerIpList": {"nameServerIp1": {"ip": "192.0.2.53"}}}
+        return 200, {}, json.dumps(response).encode()
+
+    def create_task(self, zone_names):
+        indexes = [self.account.zone_index(zone_name) for zone_name in zone_names]
+        if None in indexes:
+            # Like the real API, refuse to export zones that aren't in the account
+            return 400, {}, json.dumps([{"errorCode": 1801, "errorMessage": "Zone does not exist in the system."}]).encode()
+        with self.tasks_lock:
+            task_id = str(next(self.task_ids))
+            self.tasks[task_id] = {
+                "indexes": indexes,
+                "ready_at": time.monotonic() + self.task_time + self.task_time_per_zone * len(indexes),
+                "error": any(index in self.account.poisoned for index in indexes)
+            }
+        return 202, {"x-task-id": task_id}, b"{}"
+
+    def task_status(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return not_found()
+        if time.monotonic() < task["ready_at"]:
+            code = "PENDING"
+        else:
+            code = "ERROR" if task["error"] else "COMPLETE"
+        response = {"taskId": task_id, "code": code, "message": "Zone export failed" if code == "ERROR" else code}
+        return 200, {}, json.dumps(response).encode()
+
+    def task_result(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None or task["error"] or time.monotonic() < task["ready_at"]:
+            return not_found()
+        if len(task["indexes"]) == 1:
+            # The API returns the zone file itself, not a zip, for single-zone exports
+            return 200, {"Content-Type": "text/plain"}, self.account.zone_file(task["indexes"][0]).encode()
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+            for index in task["indexes"]:
+                zip_ref.writestr(f"{self.account.zone_name(index)}txt", self.account.zone_file(index))
+        return 200, {"Content-Type": "application/zip"}, buffer.getvalue()
+
+def endpoint_name(path):
+    """Collapse zone names and task ids in a request path into placeholders."""
+    parts = path.strip("/").split("/")
+    if parts[0] == "tasks" and len(parts) > 1:
+        parts[1] = "{id}"
+    elif parts[:2] == ["v3", "zones"] and len(parts) > 2 and parts[2] != "export":
+        parts[2] = "{zone}"
+    return "/" + "/".join(parts)
+
+def page(items, key, query):
+    limit = int(query.get("limit", ["100"])[0])
+    offset = int(query.get("offset", ["0"])[0])
+    returned = items[offset:offset + limit]
+    response = {key: returned, "resultInfo": {"totalCount": len(items), "offset": offset, "returnedCount": len(returned)}}
+    return 200, {}, json.dumps(response).encode()
+
+def not_found():
+    return 404, {}, json.dumps([{"errorCode": 70002, "errorMessage": "Not found"}]).encode()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the UltraDNS API endpoints used by zexport.py")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--zones", type=int, default=1000, help="Number of zones in the synthetic account (default: 1000)")
+    parser.add_argument("--records", type=int, default=20, help="RRsets per zone (default: 20)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mean seconds added to every request (default: 0.02)")
+    parser.add_argument("--task-time", type=float, default=0.5, help="Base seconds an export task takes (default: 0.5)")
+    parser.add_argument("--task-time-per-zone", type=float, default=0.002, help="Extra seconds an export task takes per zone (default: 0.002)")
+    parser.add_argument("--poison-rate", type=float, default=0.0, help="Fraction of zones that make their export task fail (default: 0)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429 (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503 (default: 0)")
+    parser.add_argument("--token-lifetime", type=float, help="Seconds before access tokens expire; zexport.py must then log in with -u/-p (default: tokens never expire)")
+
+    args = parser.parse_args()
+
+    account = MockAccount(args.zones, args.records, args.poison_rate)
+    server = MockServer(account, args.port, args.latency, args.task_time, args.task_time_per_zone, args.throttle_rate, args.error_rate, args.token_lifetime)
+    print(f"Mock UltraDNS API listening on {server.url} with {args.zones} zones")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_udns import MockAccount, MockServer
+
+ZEXPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "zexport.py")
+
+MODES = {
+    "bind": [],
+    "combined": ["--combined-file"],
+    "json": ["--json"],
+    # One zone named in a zones file, exported on its own like --debug does
+    "single": ["--zones-file", "single_zone.txt"]
+}
+
+def count_exported_zones(mode, directory):
+    """Count the zones a run actually wrote, to catch runs that silently skipped work."""
+    if mode in ("bind", "single"):
+        zones_dir = os.path.join(directory, "zones")
+        return len(os.listdir(zones_dir)) if os.path.isdir(zones_dir) else 0
+    if mode == "combined":
+        with open(os.path.join(directory, "combined_zone_file.conf"), "rb") as f:
+            return sum(1 for line in f if line.startswith(b"$ORIGIN"))
+    with open(os.path.join(directory, "zones_data.json"), "r") as f:
+        return len(json.load(f)["zones"])
+
+def run_export(server, mode, extra_args, keep=False):
+    """Run zexport.py against the mock server in a scratch directory and measure it."""
+    directory = tempfile.mkdtemp(prefix=f"zexport-bench-{mode}-")
+    zones = server.account.zone_count
+    if mode == "single":
+        zones = 1
+        with open(os.path.join(directory, "single_zone.txt"), "w") as f:
+            f.write(f"{server.account.zone_name(0)}\n")
+    command = [sys.executable, ZEXPORT, "-t", "bench", "--host", server.url] + MODES[mode] + extra_args
+    server.stats.reset()
+    started = time.monotonic()
+    process = subprocess.Popen(command, cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    # wait4 reports the resource usage of this child alone
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.monotonic() - started
+    if process.returncode != 0:
+        raise Exception(f"{' '.join(command)} exited with {process.returncode}:\n{stderr.decode(errors='replace')[-2000:]}")
+
+    exported = count_exported_zones(mode, directory)
+    stats = server.stats.summary()
+    if keep:
+        print(f"Output kept in {directory}")
+    else:
+        shutil.rmtree(directory)
+    return {
+        "mode": mode,
+        "zones": zones,
+        "exported": exported,
+        "seconds": round(elapsed, 2),
+        "zones_per_second": round(zones / elapsed, 1),
+        "peak_rss_mb": round(rusage.ru_maxrss / 1024, 1),
+        "requests": stats["requests"],
+        "p50_ms": stats["latency"]["p50_ms"],
+        "p99_ms": stats["latency"]["p99_ms"],
+        "statuses": stats["statuses"],
+        "endpoints": stats["endpoints"]
+    }
+
+def print_results(results):
+    header = f"{'mode':<9} {'zones':>7} {'exported':>8} {'seconds':>8} {'zones/s':>8} {'rss MB':>7} {'requests':>9} {'p50 ms':>7} {'p99 ms':>7}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(f"{result['mode']:<9} {result['zones']:>7} {result['exported']:>8} {result['seconds']:>8} {result['zones_per_second']:>8} "
+              f"{result['peak_rss_mb']:>7} {result['requests']:>9} {result['p50_ms']:>7} {result['p99_ms']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zexport.py end to end against a local mock UltraDNS API")
+    parser.add_argument("--sizes", default="1000", help="Comma separated account sizes to benchmark, e.g. 1000,10000,100000 (default: 1000)")
+    parser.add_argument("--modes", default="bind,json", help=f"Comma separated export modes to run, out of {','.join(MODES)} (default: bind,json)")
+    parser.add_argument("--records", type=int, default=20, help="RRsets per zone (default: 20)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mean seconds the mock adds to every request (default: 0.02)")
+    parser.add_argument("--task-time", type=float, default=0.5, help="Base seconds an export task takes (default: 0.5)")
+    parser.add_argument("--task-time-per-zone", type=float, default=0.002, help="Extra seconds an export task takes per zone (default: 0.002)")
+    parser.add_argument("--poison-rate", type=float, default=0.0, help="Fraction of zones that make their export task fail (default: 0)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429 (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503 (default: 0)")
+    parser.add_argument("--output", help="Also write the results, including per-endpoint latencies, to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the exported files instead of deleting them")
+    parser.add_argument("zexport_args", nargs=argparse.REMAINDER, help="Extra arguments passed to zexport.py after --, e.g. -- --workers 16")
+
+    args = parser.parse_args()
+    extra_args = [arg for arg in args.zexport_args if arg != "--"]
+    modes = args.modes.split(",")
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"Unknown mode {mode}.")
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        account = MockAccount(size, args.records, args.poison_rate)
+        server = MockServer(account, latency=args.latency, task_time=args.task_time,
+                            task_time_per_zone=args.task_time_per_zone, throttle_rate=args.throttle_rate,
+                            error_rate=args.error_rate)
+        server.start()
+        try:
+            for mode in modes:
+                print(f"Running {mode} export of {size} zones...", file=sys.stderr)
+                results.append(run_export(server, mode, extra_args, args.keep))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,117 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-def generate_named_conf(directory, output_path):
-    zone_stanzas = []
-
-    # Loop through each file in the directory
-    for filename in os.listdir(directory):
-        if filename.endswith('.conf'):
-            file_path = os.path.join(directory, filename)
-            with open(file_path, 'r') as infile:
-                lines = infile.readlines()
-                
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith("$ORIGIN"):
-                        domain_name = line.split()[1].rstrip('.')
-                        stanza = f"""
+def zone_stanza(domain_name, filename):
+    return f"""
 zone "{domain_name}" {{
     type master;
     file "/etc/bind/{filename}";
 }};
 """
-                        zone_stanzas.append(stanza)
+
+def read_origin(file_path):
+    """Return the domain of the first $ORIGIN line, reading no further than that line."""
+    with open(file_path, 'r', errors='replace') as infile:
+        for line in infile:
+            line = line.strip()
+            if line.startswith("$ORIGIN"):
+                return line.split()[1].rstrip('.')
+    return None
+
+def manifest_names(manifest_path):
+    """Map zone file names to zone names using the manifest zexport.py writes in BIND mode.
+
+    Manifests of JSON or combined-file exports list the same file for every
+    zone, so they are rejected with a ValueError.
+    """
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get("mode") != "bind":
+        raise ValueError(f"{manifest_path} is the manifest of a {manifest.get('mode')} export, not a BIND one with a file per zone.")
+    return {os.path.basename(info["file"]): zone_name.rstrip('.') for zone_name, info in manifest["zones"].items() if "file" in info}
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def generate_named_conf(directory, output_path, manifest_path=None, from_filenames=False, incremental=False, cache_path=None, workers=16):
+    """Write a named.conf with one zone stanza per .conf file in directory.
+
+    Zone names come from the manifest if one is given, from the file names
+    if from_filenames is set, and otherwise from the first $ORIGIN line of
+    each file. zexport.py writes a "/" in a zone name as "_", so file names
+    with a "_" are always read. Files are scanned in parallel, and each scan
+    stops at the first $ORIGIN. The names found are cached with each file's
+    size and mtime, and with incremental set, files that haven't changed
+    since the cache was written aren't opened again.
+    """
+    cache_path = cache_path or f"{output_path}.cache"
+    cache = load_cache(cache_path) if incremental else {}
+    names = manifest_names(manifest_path) if manifest_path else {}
+
+    files = sorted((entry for entry in os.scandir(directory) if entry.name.endswith('.conf') and entry.is_file()), key=lambda entry: entry.name)
+    new_cache = {}
+    to_scan = []
+    for entry in files:
+        stat = entry.stat()
+        key = [stat.st_mtime_ns, stat.st_size]
+        if entry.name in names:
+            new_cache[entry.name] = key + [names[entry.name]]
+        elif from_filenames and '_' not in entry.name:
+            new_cache[entry.name] = key + [entry.name[:-len('.conf')]]
+        elif entry.name in cache and cache[entry.name][:2] == key:
+            new_cache[entry.name] = cache[entry.name]
+        else:
+            new_cache[entry.name] = key + [None]
+            to_scan.append(entry)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for entry, domain_name in zip(to_scan, executor.map(read_origin, [entry.path for entry in to_scan])):
+            new_cache[entry.name][2] = domain_name
+
+    zone_stanzas = []
+    seen = set()
+    for entry in files:
+        domain_name = new_cache[entry.name][2]
+        if domain_name is None:
+            print(f"Warning: No $ORIGIN found in {entry.name}. Skipping...")
+        elif domain_name in seen:
+            print(f"Warning: {domain_name} appears in more than one file, skipping {entry.name}.")
+        else:
+            seen.add(domain_name)
+            zone_stanzas.append(zone_stanza(domain_name, entry.name))
 
     with open(output_path, 'w') as outfile:
         outfile.write('\n'.join(zone_stanzas))
+    with open(cache_path, 'w') as f:
+        json.dump(new_cache, f)
 
-    print(f"named.conf file written to {output_path}")
+    print(f"named.conf file written to {output_path} ({len(zone_stanzas)} zones, {len(to_scan)} files scanned)")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Generate named.conf from a directory of zone files")
     parser.add_argument("directory", default="zones", help="Directory containing .conf zone files")
     parser.add_argument("--output", default="named.conf", help="Path to the output named.conf file")
-    
+    parser.add_argument("--manifest", help="Manifest of a zexport.py BIND export (e.g. zexport_manifest.json) to take zone names from instead of reading the files")
+    parser.add_argument("--from-filenames", action="store_true", help="Take zone names from the file names zexport.py writes instead of reading the files (files with a _ in their name are still read)")
+    parser.add_argument("-i", "--incremental", action="store_true", help="Only rescan files whose size or mtime changed since the last run")
+    parser.add_argument("--cache", help="Path of the cache of zone names found in each file (default: <output>.cache)")
+    parser.add_argument("-W", "--workers", type=int, default=16, help="Number of files to scan concurrently (default: 16)")
+
     args = parser.parse_args()
-    
-    generate_named_conf(args.directory, args.output)
+
+    try:
+        generate_named_conf(args.directory, args.output, args.manifest, args.from_filenames, args.incremental, args.cache, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
 
 
 if __name__ == "__main__":
@@ -3,13 +3,29 @@
 import requests
 import argparse
 import zipfile
-from io import BytesIO
+import tempfile
+import shutil
 import time
 from tqdm import tqdm
-from ultra_rest_client.connection import RestApiConnection
+from ultra_rest_client.connection import RestApiConnection, AuthError
 import json
 import os
 import datetime
+import email.utils
+import hashlib
+import importlib.util
+import random
+import collections
+import threading
+import queue
+import re
+import sqlite3
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 class CustomHelpParser(argparse.ArgumentParser):
     def print_help(self, *args, **kwargs):
@@ -25,16 +41,902 @@ __     ______     _______   _______ ___________ _____
         print(ascii_art)
         super().print_help(*args, **kwargs)
 
-def get_zones(client):
-    zones = []
+# Batch downloads are kept in memory up to this size, then spill to disk
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Columnar dataset layout, read back by utils/zonereader.py. Columns are the
+# ones utils/csvgen.py writes; "dict" columns store an index into a
+# dictionary of distinct values kept in the footer, "str" columns store
+# UTF-8 byte lengths followed by the strings themselves.
+COLUMNAR_COLUMNS = [
+    ("zone_name", "dict"),
+    ("zone_type", "dict"),
+    ("owner_name", "str"),
+    ("ttl", "dict"),
+    ("class", "dict"),
+    ("rrtype", "dict"),
+    ("rdata", "str")
+]
+ROW_GROUP_SIZE = 65536
+
+def load_zonereader():
+    """Return utils/zonereader.py, which defines the columnar dataset's rows (zone_rows) and magic bytes.
+
+    It is loaded from its path under a private name, and only when a
+    columnar dataset is written, so sys.path is left alone and zexport.py
+    needs nothing from utils/ otherwise.
+    """
+    module = sys.modules.get("_zexport_zonereader")
+    if module is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils", "zonereader.py")
+        spec = importlib.util.spec_from_file_location("_zexport_zonereader", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules["_zexport_zonereader"] = module
+    return module
+
+class Metrics:
+    """Counts and timings for every API request and pipeline stage of a run.
+
+    Requests are grouped by method and endpoint, with zone names and task ids
+    collapsed into placeholders. Stage times are added up across threads, so
+    concurrent stages can add up to more than the run's wall-clock time.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.status = "ok"
+        self.endpoints = {}
+        self.stages = {}
+        self.counters = collections.Counter()
+
+    def record_request(self, method, uri, status, seconds, size, retry=False):
+        key = f"{method} {endpoint_name(uri)}"
+        with self.lock:
+            endpoint = self.endpoints.setdefault(key, {"count": 0, "bytes": 0, "retries": 0, "rate_limited": 0, "statuses": collections.Counter(), "latencies": []})
+            endpoint["count"] += 1
+            endpoint["bytes"] += size
+            endpoint["retries"] += retry
+            endpoint["rate_limited"] += status == requests.codes.TOO_MANY
+            endpoint["statuses"][str(status)] += 1
+            endpoint["latencies"].append(seconds)
+
+    def add_stage_time(self, name, seconds):
+        with self.lock:
+            stage = self.stages.setdefault(name, {"count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.monotonic() - started)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def summary(self):
+        with self.lock:
+            endpoints = {}
+            for key, endpoint in sorted(self.endpoints.items()):
+                latencies = sorted(endpoint["latencies"])
+                endpoints[key] = {
+                    "count": endpoint["count"],
+                    "bytes": endpoint["bytes"],
+                    "retries": endpoint["retries"],
+                    "rate_limited": endpoint["rate_limited"],
+                    "statuses": dict(sorted(endpoint["statuses"].items())),
+                    "latency_seconds": {
+                        "total": round(sum(latencies), 3),
+                        "p50": round(latencies[len(latencies) // 2], 3),
+                        "p99": round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)], 3),
+                        "max": round(latencies[-1], 3)
+                    }
+                }
+            return {
+                "status": self.status,
+                "started": int(self.started),
+                "duration_seconds": round(time.time() - self.started, 3),
+                "requests": sum(endpoint["count"] for endpoint in endpoints.values()),
+                "bytes": sum(endpoint["bytes"] for endpoint in endpoints.values()),
+                "endpoints": endpoints,
+                "stages": {name: {"count": stage["count"], "seconds": round(stage["seconds"], 3)} for name, stage in self.stages.items()},
+                "counters": dict(self.counters)
+            }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+
+    def write_prometheus(self, path):
+        """Write the summary in the Prometheus text exposition format, e.g. for the node_exporter textfile collector."""
+        summary = self.summary()
+        lines = [
+            "# HELP zexport_run_success Whether the last export run finished without an error.",
+            "# TYPE zexport_run_success gauge",
+            f"zexport_run_success {int(summary['status'] == 'ok')}",
+            "# HELP zexport_run_duration_seconds Wall-clock duration of the last export run.",
+            "# TYPE zexport_run_duration_seconds gauge",
+            f"zexport_run_duration_seconds {summary['duration_seconds']}"
+        ]
+        endpoint_metrics = [
+            ("requests_total", "API requests sent.", "count"),
+            ("response_bytes_total", "Bytes received from the API.", "bytes"),
+            ("request_retries_total", "API requests that were retries of an earlier request.", "retries"),
+            ("rate_limited_total", "API requests answered with HTTP 429.", "rate_limited")
+        ]
+        for name, help_text, field in endpoint_metrics:
+            lines.append(f"# HELP zexport_{name} {help_text}")
+            lines.append(f"# TYPE zexport_{name} counter")
+            for key, endpoint in summary["endpoints"].items():
+                method, uri = key.split(" ", 1)
+                lines.append(f'zexport_{name}{{method="{method}",endpoint="{uri}"}} {endpoint[field]}')
+        lines.append("# HELP zexport_request_seconds_total Time spent waiting on API requests.")
+        lines.append("# TYPE zexport_request_seconds_total counter")
+        for key, endpoint in summary["endpoints"].items():
+            method, uri = key.split(" ", 1)
+            lines.append(f'zexport_request_seconds_total{{method="{method}",endpoint="{uri}"}} {endpoint["latency_seconds"]["total"]}')
+        lines.append("# HELP zexport_stage_seconds_total Time spent in each pipeline stage, summed across threads.")
+        lines.append("# TYPE zexport_stage_seconds_total counter")
+        for name, stage in summary["stages"].items():
+            lines.append(f'zexport_stage_seconds_total{{stage="{name}"}} {stage["seconds"]}')
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+def endpoint_name(uri):
+    """Collapse zone names and task ids in a request path into placeholders."""
+    path = uri.split("?", 1)[0]
+    path = re.sub(r"^/tasks/[^/]+", "/tasks/{id}", path)
+    return re.sub(r"^/v3/zones/(?!export$)[^/]+", "/v3/zones/{zone}", path)
+
+class RateLimiter:
+    """Token bucket shared by every thread, allowing rate requests per second with bursts of up to burst.
+
+    Without a rate, requests are never held back by the bucket, but pause
+    still holds every thread back, e.g. while the API asks for a break with
+    HTTP 429.
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate or 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """Wait until a request may be sent and return how long that took."""
+        started = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if not self.rate:
+                        return now - started
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - started
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# How often each class of failed request is retried, and the first backoff in seconds; it doubles with each retry
+RETRY_POLICY = {
+    "rate_limited": (8, 1),   # HTTP 429, waiting as long as Retry-After asks instead when it is sent
+    "unavailable": (5, 2),    # HTTP 502, 503 and 504
+    "server_error": (2, 1),   # HTTP 500, which the API also returns for some zones every time
+    "connection": (5, 1)      # Connection errors and timeouts
+}
+MAX_BACKOFF = 60
+# Connect and read timeouts for every request
+REQUEST_TIMEOUT = (10, 300)
+# Refresh the access token this many seconds (at most a quarter of its lifetime) before it expires
+TOKEN_REFRESH_MARGIN = 120
+
+def error_class(status):
+    if status == requests.codes.TOO_MANY:
+        return "rate_limited"
+    if status in (502, 503, 504):
+        return "unavailable"
+    if status == 500:
+        return "server_error"
+    return None
+
+def retry_after(response):
+    """Seconds the Retry-After header of a response asks for, or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0, (email.utils.parsedate_to_datetime(value) - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def is_token_rejected(response):
+    """Whether an error response says the access token was rejected; successful responses are never parsed here."""
+    if response.status_code < 400:
+        return False
+    if response.status_code == requests.codes.UNAUTHORIZED:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    if isinstance(body, list) and body:
+        body = body[0]
+    return isinstance(body, dict) and body.get("errorCode") == 60001
+
+class ZexportConnection(RestApiConnection):
+    """RestApiConnection that schedules every request of a run.
+
+    All requests, including authentication and streamed downloads, go over
+    one pooled keep-alive session and through a shared RateLimiter. Failed
+    requests are retried according to RETRY_POLICY; HTTP 429 pauses every
+    thread for as long as Retry-After asks. The access token is refreshed
+    shortly before it expires, or once for all threads when the API rejects
+    it. Error responses that aren't retried raise requests.HTTPError.
+    Every request is recorded in metrics.
+    """
+
+    def __init__(self, pool_size=10, metrics=None, rate_limit=None, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics or Metrics()
+        self.limiter = RateLimiter(rate_limit)
+        self.token_lock = threading.Lock()
+        self.refresh_at = None
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _request_token(self, payload):
+        """Send a token request and keep the tokens and expiry time it returns."""
+        try:
+            response = self._send("POST", "/v1/authorization/token", None, token_request=True, data=payload)[0]
+        except requests.HTTPError as e:
+            raise AuthError(e.response.json())
+        json_body = response.json()
+        self.access_token = json_body.get('accessToken')
+        self.refresh_token = json_body.get('refreshToken')
+        expires_in = json_body.get('expiresIn')
+        if expires_in:
+            expires_in = float(expires_in)
+            self.refresh_at = time.monotonic() + expires_in - min(TOKEN_REFRESH_MARGIN, expires_in / 4)
+        else:
+            self.refresh_at = None
+
+    def auth(self, username, password):
+        self._request_token({"grant_type": "password", "username": username, "password": password})
+
+    def _refresh(self):
+        self.metrics.increment("token_refreshes")
+        self._request_token({"grant_type": "refresh_token", "refresh_token": self.refresh_token})
+
+    def _refresh_if_expiring(self):
+        if self.refresh_at is None or not self.refresh_token or time.monotonic() < self.refresh_at:
+            return
+        with self.token_lock:
+            # Another thread may have refreshed it while this one waited for the lock
+            if time.monotonic() >= self.refresh_at:
+                self.metrics.increment("proactive_token_refreshes")
+                self._refresh()
+
+    def _refresh_rejected(self, rejected_token):
+        with self.token_lock:
+            if self.access_token == rejected_token:
+                self._refresh()
+
+    def _backoff(self, error, attempt):
+        base = RETRY_POLICY[error][1]
+        return min(MAX_BACKOFF, base * 2 ** attempt) * random.uniform(0.5, 1)
+
+    def _send(self, method, uri, content_type="application/json", stream=False, token_request=False, **kwargs):
+        """Send a request through the scheduler and return the successful response.
+
+        Returns (response, started, retried). A streamed response is left
+        for the caller to read and record in metrics; every other attempt is
+        recorded here. Token requests are sent without the access token and
+        never trigger a refresh themselves.
+        """
+        url = self._get_connection() + uri
+        attempts = collections.Counter()
+        refreshed = False
+        while True:
+            if not token_request:
+                self._refresh_if_expiring()
+            waited = self.limiter.acquire()
+            if waited:
+                self.metrics.add_stage_time("rate_limit_wait", waited)
+            token = self.access_token
+            retried = sum(attempts.values()) > 0 or refreshed
+            started = time.monotonic()
+            headers = {"Accept": "application/json"} if token_request else self._build_headers(content_type)
+            try:
+                response = self.session.request(method, url, headers=headers, stream=stream,
+                                                proxies=self.proxy, verify=self.verify_https, timeout=REQUEST_TIMEOUT, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.metrics.record_request(method, uri, 0, time.monotonic() - started, 0, retried)
+                if attempts["connection"] >= RETRY_POLICY["connection"][0]:
+                    raise
+                time.sleep(self._backoff("connection", attempts["connection"]))
+                attempts["connection"] += 1
+                continue
+
+            if response.status_code < 400 and stream:
+                return response, started, retried
+            self.metrics.record_request(method, uri, response.status_code, time.monotonic() - started, len(response.content), retried)
+            rejected = not token_request and is_token_rejected(response)
+            if response.status_code < 400 and not rejected:
+                return response, started, retried
+
+            if rejected and self.refresh_token and not refreshed:
+                self._refresh_rejected(token)
+                refreshed = True
+                continue
+            error = error_class(response.status_code)
+            if error is None or attempts[error] >= RETRY_POLICY[error][0]:
+                response.raise_for_status()
+                return response, started, retried
+            delay = self._backoff(error, attempts[error])
+            if error == "rate_limited":
+                delay = retry_after(response) or delay
+                # The limit applies to the whole account, so every thread backs off
+                self.limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            self.metrics.increment(f"retries_{error}")
+            attempts[error] += 1
+
+    def _do_call(self, uri, method, params=None, body=None, retry=True, files=None, content_type="application/json"):
+        response, started, retried = self._send(method, uri, content_type, params=params, data=body, files=files)
+        if response.status_code == requests.codes.NO_CONTENT:
+            return {}
+
+        content_type = response.headers.get('content-type', 'none')
+        if content_type == 'text/plain':
+            return response.text
+        if content_type == 'application/zip':
+            return response.content
+
+        try:
+            json_body = response.json()
+        except requests.exceptions.JSONDecodeError:
+            json_body = {}
+
+        if response.status_code == requests.codes.ACCEPTED:
+            if 'x-task-id' in response.headers:
+                json_body.update({"task_id": response.headers['x-task-id']})
+            if 'location' in response.headers:
+                json_body.update({"location": response.headers['location']})
+
+        return json_body
+
+    def download(self, uri, out_file):
+        """Stream the body of a GET request into out_file instead of holding it in memory."""
+        start_position = out_file.tell()
+        attempts = 0
+        while True:
+            response, started, retried = self._send("GET", uri, stream=True)
+            size = 0
+            with response:
+                try:
+                    for chunk in response.iter_content(COPY_CHUNK_SIZE):
+                        out_file.write(chunk)
+                        size += len(chunk)
+                    self.metrics.record_request("GET", uri, response.status_code, time.monotonic() - started, size, retried)
+                    return
+                except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                    self.metrics.record_request("GET", uri, 0, time.monotonic() - started, size, retried)
+                    if attempts >= RETRY_POLICY["connection"][0]:
+                        raise
+            # The connection dropped mid-download, start over
+            out_file.seek(start_position)
+            out_file.truncate()
+            time.sleep(self._backoff("connection", attempts))
+            attempts += 1
+
+class ZoneJsonWriter:
+    """Write zones_data.json one zone at a time instead of dumping one big object.
+
+    The document keeps the {"username", "timestamp", "zones": [...]} shape and,
+    when indented, is byte-identical to json.dump(..., indent=4). With compact
+    set, whitespace is dropped entirely. Passing resume_offset and
+    resume_count reopens a partially written document, discarding anything
+    after the offset, and carries on appending zones.
+
+    Since each zone is written at a known offset, a later run can copy an
+    unchanged zone straight out of this file instead of fetching it again.
+    """
+
+    def __init__(self, path, username, timestamp, compact=False, resume_offset=None, resume_count=0):
+        self.compact = compact
+        if resume_offset is not None:
+            self.out_file = open(path, "r+b")
+            self.out_file.seek(resume_offset)
+            self.out_file.truncate()
+            self.offset = resume_offset
+            self.count = resume_count
+            return
+        self.out_file = open(path, "wb")
+        self.offset = 0
+        self.count = 0
+        if compact:
+            self._write('{"username":%s,"timestamp":%s,"zones":[' % (json.dumps(username), json.dumps(timestamp)))
+        else:
+            self._write('{\n    "username": %s,\n    "timestamp": %s,\n    "zones": [' % (json.dumps(username), json.dumps(timestamp)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, text):
+        # json.dumps escapes everything outside ASCII, so characters and bytes line up
+        self.out_file.write(text.encode("ascii"))
+        self.offset += len(text)
+
+    def encode_zone(self, zone):
+        """Serialize a zone exactly as it will appear in the document."""
+        if self.compact:
+            return json.dumps(zone, separators=(",", ":"))
+        return json.dumps(zone, indent=4).replace("\n", "\n        ")
+
+    def write_encoded(self, text):
+        """Append a zone serialized by encode_zone and return its (offset, length) in the file."""
+        self._write("," if self.count else "")
+        if not self.compact:
+            self._write("\n        ")
+        offset = self.offset
+        self._write(text)
+        self.count += 1
+        return offset, len(text)
+
+    def write_zone(self, zone):
+        return self.write_encoded(self.encode_zone(zone))
+
+    def flush(self):
+        self.out_file.flush()
+
+    def close(self):
+        if self.out_file.closed:
+            return
+        if self.compact:
+            self._write("]}")
+        else:
+            self._write("\n    ]\n}" if self.count else "]\n}")
+        self.out_file.close()
+
+class ZoneColumnarWriter:
+    """Write zones as a compact columnar dataset with one row per rdata value.
+
+    Rows are buffered into row groups of row_group_size rows, and each column
+    of a group is stored as its own zlib-compressed chunk, so readers can
+    load just the columns they need. Low-cardinality columns (zone name and
+    type, TTL, class, rrtype) are dictionary-encoded. The file ends with a
+    JSON footer listing the dictionaries, where every chunk is and the zones
+    that have no rows (e.g. an empty rrSets list), followed by the footer's
+    length and the magic bytes.
+    """
+
+    def __init__(self, path, username, timestamp, row_group_size=ROW_GROUP_SIZE):
+        zonereader = load_zonereader()
+        self.zone_rows = zonereader.zone_rows
+        self.magic = zonereader.COLUMNAR_MAGIC
+        self.out_file = open(path, "wb")
+        self.out_file.write(self.magic)
+        self.header = {"username": username, "timestamp": timestamp}
+        self.row_group_size = row_group_size
+        self.codes = {name: {} for name, encoding in COLUMNAR_COLUMNS if encoding == "dict"}
+        self.dictionaries = {name: [] for name in self.codes}
+        self.pending = [[] for _ in COLUMNAR_COLUMNS]
+        self.row_groups = []
+        self.rows = 0
+        # [rows before the zone, zone name, zone type] for zones without rows
+        self.empty_zones = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_zone(self, zone):
+        pending = self.pending
+        start = len(pending[0])
+        for row in self.zone_rows(zone):
+            for column, value in zip(pending, row):
+                column.append(value)
+        if len(pending[0]) == start:
+            self.empty_zones.append([self.rows + start, zone["zoneName"], zone["type"]])
+        if len(pending[0]) >= self.row_group_size:
+            self._write_row_group()
+
+    def _encode(self, name, encoding, values):
+        if encoding == "dict":
+            codes = self.codes[name]
+            dictionary = self.dictionaries[name]
+            indices = array("I")
+            for value in values:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(dictionary)
+                    dictionary.append(value)
+                indices.append(code)
+            return indices.tobytes()
+        encoded = [value.encode("utf-8") for value in values]
+        return array("I", map(len, encoded)).tobytes() + b"".join(encoded)
+
+    def _write_row_group(self):
+        rows = len(self.pending[0])
+        if not rows:
+            return
+        chunks = {}
+        for (name, encoding), values in zip(COLUMNAR_COLUMNS, self.pending):
+            data = zlib.compress(self._encode(name, encoding, values))
+            chunks[name] = [self.out_file.tell(), len(data)]
+            self.out_file.write(data)
+        self.row_groups.append({"rows": rows, "columns": chunks})
+        self.rows += rows
+        self.pending = [[] for _ in COLUMNAR_COLUMNS]
+
+    def close(self):
+        if self.out_file.closed:
+            return
+        self._write_row_group()
+        footer = json.dumps({
+            "version": 1,
+            "byteorder": sys.byteorder,
+            "header": self.header,
+            "columns": [{"name": name, "encoding": encoding} for name, encoding in COLUMNAR_COLUMNS],
+            "dictionaries": self.dictionaries,
+            "rows": self.rows,
+            "row_groups": self.row_groups,
+            "empty_zones": self.empty_zones
+        }).encode("utf-8")
+        self.out_file.write(footer)
+        self.out_file.write(struct.pack("<Q", len(footer)))
+        self.out_file.write(self.magic)
+        self.out_file.close()
+
+class ZoneStore:
+    """SQLite copy of the JSON export, indexed for lookups with utils/zquery.py.
+
+    Each zone is upserted as a whole: its row in zones is inserted or
+    updated, and its rrsets, rdata values and web forwards are replaced.
+    Writes are batched into one transaction until commit is called. Zones
+    are stored with their fingerprint, so later runs can leave zones that
+    haven't changed alone.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS zones (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            type TEXT NOT NULL,
+            data TEXT,
+            fingerprint TEXT,
+            updated INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS rrsets (
+            id INTEGER PRIMARY KEY,
+            zone_id INTEGER NOT NULL REFERENCES zones(id),
+            owner TEXT NOT NULL COLLATE NOCASE,
+            rrtype TEXT NOT NULL,
+            ttl INTEGER,
+            data TEXT
+        );
+        CREATE TABLE IF NOT EXISTS rdata (
+            rrset_id INTEGER NOT NULL REFERENCES rrsets(id),
+            position INTEGER NOT NULL,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS web_forwards (
+            zone_id INTEGER NOT NULL REFERENCES zones(id),
+            request_to TEXT,
+            redirect_to TEXT,
+            forward_type TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS rrsets_zone ON rrsets(zone_id);
+        CREATE INDEX IF NOT EXISTS rrsets_owner ON rrsets(owner);
+        CREATE INDEX IF NOT EXISTS rrsets_rrtype ON rrsets(rrtype);
+        CREATE INDEX IF NOT EXISTS rdata_rrset ON rdata(rrset_id);
+        CREATE INDEX IF NOT EXISTS rdata_value ON rdata(value);
+        CREATE INDEX IF NOT EXISTS web_forwards_zone ON web_forwards(zone_id);
+        CREATE INDEX IF NOT EXISTS web_forwards_redirect ON web_forwards(redirect_to);
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(self.SCHEMA)
+        self.fingerprints = {name: fingerprint for name, fingerprint in self.db.execute("SELECT name, fingerprint FROM zones")}
+        # rrset ids are handed out here so rdata rows can be inserted in bulk alongside them
+        self.next_rrset_id = self.db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM rrsets").fetchone()[0]
+
+    def has(self, zone_name, fingerprint):
+        """Whether the zone is already stored with this fingerprint."""
+        return fingerprint is not None and self.fingerprints.get(zone_name) == json.dumps(fingerprint)
+
+    def _delete_records(self, zone_id):
+        self.db.execute("DELETE FROM rdata WHERE rrset_id IN (SELECT id FROM rrsets WHERE zone_id = ?)", (zone_id,))
+        self.db.execute("DELETE FROM rrsets WHERE zone_id = ?", (zone_id,))
+        self.db.execute("DELETE FROM web_forwards WHERE zone_id = ?", (zone_id,))
+
+    def upsert_zone(self, zone, fingerprint=None):
+        zone_name = zone["zoneName"]
+        extra = {key: value for key, value in zone.items() if key not in ("zoneName", "type", "rrSets", "webForwards")}
+        fingerprint = json.dumps(fingerprint) if fingerprint is not None else None
+        self.db.execute(
+            "INSERT INTO zones (name, type, data, fingerprint, updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET type = excluded.type, data = excluded.data, "
+            "fingerprint = excluded.fingerprint, updated = excluded.updated",
+            (zone_name, zone["type"], json.dumps(extra) if extra else None, fingerprint, int(time.time()))
+        )
+        zone_id = self.db.execute("SELECT id FROM zones WHERE name = ?", (zone_name,)).fetchone()[0]
+        if zone_name in self.fingerprints:
+            self._delete_records(zone_id)
+        self.fingerprints[zone_name] = fingerprint
+
+        rrset_rows = []
+        rdata_rows = []
+        for rrset in zone.get("rrSets", []):
+            rrset_id = self.next_rrset_id
+            self.next_rrset_id += 1
+            extra = {key: value for key, value in rrset.items() if key not in ("ownerName", "rrtype", "ttl", "rdata")}
+            rrset_rows.append((rrset_id, zone_id, rrset["ownerName"], rrset["rrtype"].split(" ")[0], rrset.get("ttl"), json.dumps(extra) if extra else None))
+            rdata_rows.extend((rrset_id, position, value) for position, value in enumerate(rrset.get("rdata", [])))
+        self.db.executemany("INSERT INTO rrsets (id, zone_id, owner, rrtype, ttl, data) VALUES (?, ?, ?, ?, ?, ?)", rrset_rows)
+        self.db.executemany("INSERT INTO rdata (rrset_id, position, value) VALUES (?, ?, ?)", rdata_rows)
+        self.db.executemany(
+            "INSERT INTO web_forwards (zone_id, request_to, redirect_to, forward_type, data) VALUES (?, ?, ?, ?, ?)",
+            [(zone_id, forward.get("requestTo"), forward.get("defaultRedirectTo"), forward.get("defaultForwardType"), json.dumps(forward))
+             for forward in zone.get("webForwards", [])]
+        )
+
+    def prune(self, zone_names):
+        """Remove every stored zone not in zone_names and return how many there were."""
+        stale = [name for name in self.fingerprints if name not in zone_names]
+        for name in stale:
+            zone_id = self.db.execute("SELECT id FROM zones WHERE name = ?", (name,)).fetchone()[0]
+            self._delete_records(zone_id)
+            self.db.execute("DELETE FROM zones WHERE id = ?", (zone_id,))
+            del self.fingerprints[name]
+        return len(stale)
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+class Manifest:
+    """Checkpoint of an export run, kept in a small JSON file next to the output.
+
+    It records which zones have been exported and where their output went, so
+    an interrupted run can pick up where it stopped with --resume, and the
+    result of a finished run can be inspected without opening every zone file.
+    Saves are atomic and, unless forced, happen at most every save_interval
+    seconds.
+
+    Zones are stored with the fingerprint found for them in fingerprints, so
+    the next --incremental run can tell which zones changed. Zone files that
+    a run added or changed are listed under "changes", so downstream tools
+    only need to process those.
+    """
+
+    def __init__(self, path, mode, save_interval=5):
+        self.path = path
+        self.save_interval = save_interval
+        self.last_saved = 0
+        self.lock = threading.Lock()
+        self.fingerprints = {}
+        self.data = {
+            "version": 1,
+            "mode": mode,
+            "complete": False,
+            "started": int(time.time()),
+            "zones": {}
+        }
+
+    @classmethod
+    def load(cls, path, mode, complete=False):
+        """Return the manifest of an unfinished (or, with complete set, finished) run in the same mode, or None.
+
+        With complete set to None, the manifest is returned whether or not its run finished.
+        """
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data.get("mode") != mode or complete is not None and data.get("complete") != complete:
+            return None
+        manifest = cls(path, mode)
+        manifest.data = data
+        return manifest
+
+    def __len__(self):
+        return len(self.data["zones"])
+
+    def is_done(self, zone_name):
+        return zone_name in self.data["zones"]
+
+    def mark_done(self, zone_name, **info):
+        if zone_name in self.fingerprints:
+            info["fingerprint"] = self.fingerprints[zone_name]
+        with self.lock:
+            self.data["zones"][zone_name] = info
+
+    def record_change(self, zone_name, status):
+        """Note whether a zone's file was "added", "changed", "deleted" or left "unchanged" by this run."""
+        if status != "unchanged":
+            with self.lock:
+                self.data.setdefault("changes", {"added": [], "changed": [], "deleted": []})[status].append(zone_name)
+
+    def change_summary(self):
+        """Return the number of zone files added, changed and left unchanged so far, out of the zones exported."""
+        changes = self.data.get("changes", {})
+        added, changed = len(changes.get("added", [])), len(changes.get("changed", []))
+        return added, changed, len(self) - added - changed
+
+    def save(self, force=False):
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_saved < self.save_interval:
+                return
+            self.data["updated"] = int(time.time())
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.path)
+            self.last_saved = now
+
+    def finish(self):
+        self.data.pop("carry", None)
+        self.data["complete"] = True
+        self.save(force=True)
+
+def bounded_map(executor, fn, iterable, window):
+    """Like executor.map, but never runs more than window calls ahead of the consumer.
+
+    Results are yielded in input order, and at most window of them are held in
+    memory at any time.
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# Zone properties from /v3/zones that change whenever the zone's contents do
+FINGERPRINT_FIELDS = ["type", "status", "dnssecStatus", "lastModifiedDateTime", "resourceRecordCount", "serial"]
+
+def zone_fingerprint(zone):
+    fingerprint = [zone["properties"].get(field) for field in FINGERPRINT_FIELDS]
+    fingerprint.append(zone.get("originalZoneName"))
+    return fingerprint
+
+def carry_forward(previous, manifest, listed):
+    """Bring unchanged zones over from the previous run's manifest and drop deleted ones.
+
+    listed maps every zone currently in the account to its fingerprint. In
+    JSON mode unchanged zones are queued in manifest.data["carry"], to be
+    copied out of the previous zones_data.json; otherwise their files are
+    kept and they are marked done straight away. Files of zones deleted
+    upstream are removed. Returns the number of unchanged and deleted zones.
+    """
+    json_mode = manifest.data["mode"] == "json"
+    carry = {}
+    unchanged = deleted = 0
+    for zone_name, info in previous.data["zones"].items():
+        if zone_name not in listed:
+            deleted += 1
+            if not json_mode and os.path.exists(info["file"]):
+                os.remove(info["file"])
+                manifest.record_change(zone_name, "deleted")
+        elif info.get("fingerprint") == listed[zone_name]:
+            unchanged += 1
+            if json_mode:
+                carry[zone_name] = info
+            else:
+                manifest.mark_done(zone_name, **info)
+    if json_mode:
+        manifest.data["carry"] = carry
+    return unchanged, deleted
+
+def get_zones(client, info=None):
+    """Yield every zone in the account, a page at a time as the pages arrive.
+
+    If info is a dict, the account's zone count is stored in info["total"]
+    once the first page has arrived.
+    """
     cursor = ""
     while True:
         response = client.get(f"/v3/zones?limit=1000&cursor={cursor}")
-        zones.extend(response.get("zones", []))
+        if info is not None and "total" not in info:
+            info["total"] = response.get("resultInfo", {}).get("totalCount")
+        yield from response.get("zones", [])
         cursor = response["cursorInfo"].get("next")
         if not cursor:
             break
-    return zones
+
+class ZoneListing:
+    """The zones of the account, listed by a background thread.
+
+    Iterating yields zones as soon as their page has arrived, so exports can
+    start on the first page while the rest of the account is still being
+    listed. The thread stays at most prefetch zones ahead of the consumer.
+    Errors raised while listing are raised again by the iterator.
+    """
+
+    _DONE = object()
+
+    def __init__(self, client, prefetch=5000):
+        self.info = {}
+        self.first_page = threading.Event()
+        self.queue = queue.Queue(prefetch)
+        self.thread = threading.Thread(target=self._list, args=(client,), daemon=True)
+        self.thread.start()
+
+    def _list(self, client):
+        try:
+            with client.metrics.stage("zone_listing"):
+                for zone in get_zones(client, self.info):
+                    self.first_page.set()
+                    self.queue.put(zone)
+            self.queue.put(self._DONE)
+        except BaseException as e:
+            self.queue.put(e)
+        finally:
+            self.first_page.set()
+
+    def total(self):
+        """Wait for the first page and return the number of zones in the account, if the API gave it."""
+        self.first_page.wait()
+        return self.info.get("total")
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable, without reading ahead of the current batch."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 def get_zone_properties(client, zone_name):
     return client.get(f"/v3/zones/{zone_name}")
@@ -43,6 +945,29 @@ def get_zones_from_file(filename):
     with open(filename, "r") as f:
         return [line.strip() for line in f.readlines() if line.strip()]
 
+# Error codes the API refuses an export request with because of a zone in it
+ZONE_ERROR_CODES = {
+    1801  # Zone does not exist in the system
+}
+
+def rejected_export(e):
+    """Turn an export request the API refused because of a zone in it into a task response with code ERROR.
+
+    Returns None for any other error, such as an expired token or a server
+    error, which says nothing about the zones in the request.
+    """
+    if e.response.status_code != requests.codes.BAD_REQUEST:
+        return None
+    try:
+        body = e.response.json()
+    except ValueError:
+        return None
+    if isinstance(body, list) and body:
+        body = body[0]
+    if not isinstance(body, dict) or body.get("errorCode") not in ZONE_ERROR_CODES:
+        return None
+    return {"code": "ERROR", "message": body.get("errorMessage") or f"HTTP Error: {e.response.status_code}"}
+
 def initiate_zone_export(client, zone_names):
     payload = {
         "zoneNames": zone_names
@@ -52,34 +977,327 @@ def initiate_zone_export(client, zone_names):
     response = client.post("/v3/zones/export", pstring)
     return response["task_id"]
 
-def poll_task_status(client, task_id, debug=False):
-    while True:
-        response = client.get(f"/tasks/{task_id}")
-        if response["code"] == "COMPLETE":
-            break
-        if response["code"] == "ERROR":
-            if debug:
-                print(f"Warning: An error occurred processing this zone: {json.dumps(response)}")
-                return None
-            else:
-                print("Warning: There was an issue with a domain in your batch request. Consider using --debug mode.")
-                raise Exception(f"Error message: {json.dumps(response)}")
-        time.sleep(10)
-    return response
+class TaskPoller:
+    """Poll any number of background tasks from a single loop.
 
-def download_exported_data(client, task_id):
-    result = client.get(f"/tasks/{task_id}/result")
-    return result
+    Each task gets a short first check, then the wait between checks grows
+    exponentially (with jitter) up to max_interval seconds. A task that is
+    still running after max_wait seconds is treated as failed: it is
+    returned as finished, with a response whose code is ERROR.
+    """
 
-def save_zone_to_file(zone_name, content):
-    """Save the zone content to an individual file in /zones directory."""
-    if not os.path.exists('zones'):
-        os.makedirs('zones')
+    def __init__(self, client, first_wait=1, max_interval=30, max_wait=3600):
+        self.client = client
+        self.first_wait = first_wait
+        self.max_interval = max_interval
+        self.max_wait = max_wait
+        self.tasks = {}
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def add(self, task_id, payload=None):
+        now = time.monotonic()
+        self.tasks[task_id] = {
+            "payload": payload,
+            "submitted": now,
+            "last_pending": now,
+            "interval": self.first_wait,
+            "next_check": now + self.first_wait,
+            "polls": 0
+        }
+
+    def wait(self):
+        """Sleep until the next check is due, check every due task and return the finished ones.
+
+        Finished tasks are returned as (task_id, payload, response, stats) tuples.
+        The task completed somewhere between stats["pending"] and
+        stats["detected"] seconds after it was added, so their difference is
+        the most latency polling could have added.
+        """
+        if not self.tasks:
+            return []
+        delay = min(task["next_check"] for task in self.tasks.values()) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        finished = []
+        now = time.monotonic()
+        for task_id, task in list(self.tasks.items()):
+            if task["next_check"] > now:
+                continue
+            response = self.client.get(f"/tasks/{task_id}")
+            checked = time.monotonic()
+            task["polls"] += 1
+            if response["code"] not in ("COMPLETE", "ERROR") and checked - task["submitted"] > self.max_wait:
+                response = {"code": "ERROR", "message": f"Task {task_id} did not complete within {self.max_wait} seconds."}
+            if response["code"] in ("COMPLETE", "ERROR"):
+                del self.tasks[task_id]
+                stats = {
+                    "pending": task["last_pending"] - task["submitted"],
+                    "detected": checked - task["submitted"],
+                    "polls": task["polls"]
+                }
+                finished.append((task_id, task["payload"], response, stats))
+                continue
+            task["last_pending"] = checked
+            task["interval"] = min(task["interval"] * 2, self.max_interval)
+            task["next_check"] = checked + task["interval"] * random.uniform(0.8, 1.2)
+        return finished
+
+def poll_task_status(client, task_id, debug=False, max_wait=3600):
+    poller = TaskPoller(client, max_wait=max_wait)
+    poller.add(task_id)
+    finished = []
+    while not finished:
+        finished = poller.wait()
+    response = finished[0][2]
+    if response["code"] == "ERROR":
+        if debug:
+            print(f"Warning: An error occurred processing this zone: {json.dumps(response)}")
+            return None
+        else:
+            print("Warning: There was an issue with a domain in your batch request. Consider using --debug mode.")
+            raise Exception(f"Error message: {json.dumps(response)}")
+    return response
+
+def zone_file_path(zone_name):
     # Sometimes reverse DNS records have a "/" in them and it is a pain
     # Also, eliminate the trailing dot
     formatted_name = zone_name.replace('/', '_').rstrip('.')
-    with open(f"zones/{formatted_name}.conf", "w") as f:
-        f.write(content)
+    return f"zones/{formatted_name}.conf"
+
+def file_digest(f):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+class ZoneFileCache:
+    """Writes zone files only when their contents changed.
+
+    known maps zone names to the manifest entries of an earlier run, whose
+    SHA-256 digest, size and mtime describe the file that run left behind.
+    A file that still has the recorded size and mtime is compared by its
+    recorded digest without being read; any other existing file is hashed.
+    Files whose contents match aren't written at all, so they keep their
+    mtimes. Everything else is written to a temporary file and renamed
+    into place.
+    """
+
+    def __init__(self, known=None):
+        self.known = known or {}
+        os.makedirs('zones', exist_ok=True)
+
+    def _unchanged(self, path, digest, previous):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if previous and "digest" in previous and [previous.get("size"), previous.get("mtime")] == [stat.st_size, stat.st_mtime_ns]:
+            # Untouched since the earlier run, so its recorded digest still holds
+            return previous["digest"] == digest
+        with open(path, "rb") as f:
+            return file_digest(f) == digest
+
+    def save(self, zone_name, open_content):
+        """Write a zone file unless it already holds this content.
+
+        open_content is called to open the content for reading, once to hash
+        it and once more only if it has to be written, so zones are never held
+        in memory in full. Returns "added", "changed" or "unchanged" and the
+        zone's manifest entry.
+        """
+        path = zone_file_path(zone_name)
+        with open_content() as content:
+            digest = file_digest(content)
+        if self._unchanged(path, digest, self.known.get(zone_name)):
+            status = "unchanged"
+        else:
+            status = "changed" if os.path.exists(path) else "added"
+            tmp_path = f"{path}.tmp"
+            with open_content() as content, open(tmp_path, "wb") as f:
+                shutil.copyfileobj(content, f, COPY_CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        stat = os.stat(path)
+        return status, {"file": path, "digest": digest, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+def rewound(f):
+    """f from its start, in a with block that leaves it open."""
+    f.seek(0)
+    return nullcontext(f)
+
+def download_batch(client, task_id, zone_names, combined=False, files=None):
+    """Download and unpack a finished batch export.
+
+    The zip is streamed into a spooled temporary file and its members are
+    copied out in chunks, so no zone is ever held in memory in full. When
+    combined is set, the zones are concatenated into a spooled temporary file
+    that is returned for the caller to append and close; otherwise each zone
+    is saved to its own file through files, a ZoneFileCache. Also returns
+    what files.save reported for each zone in the result (None in combined
+    mode) and the wall-clock time spent in each stage. zone_names are the
+    zones the task exported, and zones are reported under these names even
+    if the result spells them in a different case; a task for a single zone
+    returns the zone file itself rather than a zip.
+    """
+    timings = {}
+    started = time.monotonic()
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as zip_file:
+        client.download(f"/tasks/{task_id}/result", zip_file)
+        timings["download"] = time.monotonic() - started
+
+        started = time.monotonic()
+        combined_zones = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) if combined else None
+        saved = {}
+        zip_file.seek(0)
+        if zipfile.is_zipfile(zip_file):
+            zip_ref = zipfile.ZipFile(zip_file, 'r')
+            requested = {zone_name.lower(): zone_name for zone_name in zone_names}
+            # Member names lose the zone name's trailing dot
+            members = [(file.replace(".txt", "").rstrip('.') + '.', lambda file=file: zip_ref.open(file, 'r'))
+                       for file in zip_ref.namelist()]
+            members = [(requested.get(zone_name.lower(), zone_name), open_content) for zone_name, open_content in members]
+        else:
+            # A task for a single zone returns the zone file itself rather than a zip
+            zip_ref = nullcontext()
+            members = [(zone_names[0], lambda: rewound(zip_file))]
+        with zip_ref:
+            for zone_name, open_content in members:
+                if combined:
+                    with open_content() as zone_data:
+                        if combined_zones.tell():
+                            combined_zones.write(b"\n")
+                        shutil.copyfileobj(zone_data, combined_zones, COPY_CHUNK_SIZE)
+                    saved[zone_name] = None
+                else:
+                    saved[zone_name] = files.save(zone_name, open_content)
+    timings["unpack"] = time.monotonic() - started
+    return combined_zones, saved, timings
+
+def record_batch(manifest, batch, saved, combined_zones=None, combined_out=None):
+    """Record the zones of a batch unpacked by download_batch in the manifest.
+
+    In combined mode, combined_zones is appended to combined_out first and
+    the new end of the file is recorded, so --resume can cut off anything
+    written after it. Zones missing from the batch's result aren't recorded
+    and are returned as (zone_name, response) tuples instead.
+    """
+    if combined_out is not None:
+        with combined_zones:
+            if combined_out.tell() and combined_zones.tell():
+                combined_out.write(b"\n")
+            combined_zones.seek(0)
+            shutil.copyfileobj(combined_zones, combined_out, COPY_CHUNK_SIZE)
+        combined_out.flush()
+        manifest.data["combined_offset"] = combined_out.tell()
+    missing = []
+    for zone in batch:
+        if zone not in saved:
+            # Left out of the result, so there's nothing on disk to mark done
+            response = {"code": "ERROR", "message": "Missing from the export task's result"}
+            tqdm.write(f"Warning: An error occurred processing {zone}: {json.dumps(response)}")
+            missing.append((zone, response))
+        elif combined_out is not None:
+            manifest.mark_done(zone, file=combined_out.name)
+        else:
+            status, entry = saved[zone]
+            manifest.mark_done(zone, **entry)
+            manifest.record_change(zone, status)
+    manifest.save()
+    return missing
+
+def run_batch_exports(client, batches, manifest, combined_out=None, max_inflight=4, max_wait=3600, total=None, files=None):
+    """Keep up to max_inflight batch export tasks running at once.
+
+    batches may be any iterable of lists of zone names, and is only read as
+    tasks are started, so a generator fed by the zone listing lets the first
+    tasks start before the listing has finished. total, if known, is the
+    number of zones in all the batches and is only used for the progress bar.
+
+    All outstanding tasks are checked by one TaskPoller. Finished batches are
+    downloaded and unpacked on a thread pool while the others are still being
+    processed server-side. With combined_out (a binary file), each batch is
+    appended to it as soon as it has been unpacked; otherwise its zones are
+    saved through files, a ZoneFileCache. Every finished batch is recorded in
+    the manifest, except for zones missing from its result, which are
+    reported as failed.
+
+    A batch that fails is split in half and both halves are retried ahead of
+    the remaining batches, so a single bad zone costs about log2(batch size)
+    extra tasks. Returns the zones that failed on their own, as (zone_name,
+    response) tuples.
+    """
+    poller = TaskPoller(client, max_wait=max_wait)
+    source = enumerate(batches, 1)
+    exhausted = False
+    # Halves of failed batches, retried ahead of the batches still to come
+    pending = collections.deque()
+    downloads = {}
+    polling_latency = []
+    failed_zones = []
+
+    def fail_batch(label, batch, response):
+        if len(batch) == 1:
+            tqdm.write(f"Warning: An error occurred processing {batch[0]}: {json.dumps(response)}")
+            failed_zones.append((batch[0], response))
+            progress.update(1)
+        else:
+            tqdm.write(f"Batch {label} ({len(batch)} zones) failed, splitting it in half and retrying.")
+            middle = len(batch) // 2
+            pending.appendleft((f"{label}.2", batch[middle:]))
+            pending.appendleft((f"{label}.1", batch[:middle]))
+
+    with ThreadPoolExecutor(max_workers=max_inflight) as executor, tqdm(total=total, desc="Processing zones") as progress:
+        try:
+            while pending or not exhausted or len(poller) or downloads:
+                while len(poller) < max_inflight:
+                    if pending:
+                        label, batch = pending.popleft()
+                    else:
+                        index, batch = next(source, (None, None))
+                        if batch is None:
+                            exhausted = True
+                            break
+                        label = str(index)
+                    try:
+                        poller.add(initiate_zone_export(client, batch), (label, batch))
+                    except requests.HTTPError as e:
+                        # Refused outright, e.g. for a zone that isn't in the account
+                        response = rejected_export(e)
+                        if response is None:
+                            raise
+                        fail_batch(label, batch, response)
+
+                for task_id, (label, batch), response, stats in poller.wait():
+                    if response["code"] == "ERROR":
+                        fail_batch(label, batch, response)
+                        continue
+                    polling_latency.append(stats["detected"] - stats["pending"])
+                    client.metrics.add_stage_time("task_wait", stats["detected"])
+                    downloads[executor.submit(download_batch, client, task_id, batch, combined_out is not None, files)] = (label, batch, stats)
+
+                if not len(poller) and not pending and exhausted:
+                    wait(downloads, return_when=FIRST_COMPLETED)
+                for future in [future for future in downloads if future.done()]:
+                    label, batch, stats = downloads.pop(future)
+                    combined_zones, saved, timings = future.result()
+                    client.metrics.add_stage_time("download", timings["download"])
+                    client.metrics.add_stage_time("unpack", timings["unpack"])
+                    failed_zones.extend(record_batch(manifest, batch, saved, combined_zones, combined_out))
+                    progress.update(len(batch))
+                    tqdm.write(f"Batch {label} ({len(batch)} zones): "
+                               f"export finished after {stats['pending']:.1f}-{stats['detected']:.1f}s ({stats['polls']} polls), "
+                               f"download {timings['download']:.1f}s, unpack {timings['unpack']:.1f}s")
+        except BaseException:
+            for future in downloads:
+                future.cancel()
+            raise
+
+    if polling_latency:
+        print(f"Polling added at most {sum(polling_latency) / len(polling_latency):.1f}s per batch on average "
+              f"({max(polling_latency):.1f}s worst case).")
+    return failed_zones
 
 def get_rrsets_for_zone(client, zone_name):
     """Fetch all RRsets for the specified zone."""
@@ -140,125 +1358,325 @@ def get_web_forwards_for_zone(client, zone_name):
 
     return all_web_forwards
 
-def main(username=None, password=None, token=None, refresh_token="", combined_file=False, json_output=False, debug=False, zones_file=None):
-    client = RestApiConnection()
+# System-generated A records that UltraDNS creates for web forwards
+WEB_FORWARD_IPS = frozenset(["204.74.99.100", "204.74.99.101", "204.74.99.102", "204.74.99.103"])
+# Per-zone counts of what filter_web_forward_records removed, kept in the zone's manifest entry
+WEB_FORWARD_STATS = ["web_forward_values_removed", "web_forward_rrsets_removed"]
+
+def filter_web_forward_records(rrsets):
+    """Remove the system-generated web forward addresses from a zone's rrsets in one pass.
+
+    Every value of every A rrset is checked. Only the system addresses are
+    removed from an rrset, and the rrset is dropped only if nothing else is
+    left in it. Returns the remaining rrsets and the number of values and
+    rrsets removed; any removed value means the zone has web forwards.
+    """
+    kept = []
+    values_removed = rrsets_removed = 0
+    for record in rrsets:
+        rdata = record.get("rdata")
+        if record["rrtype"] == "A (1)" and rdata and not WEB_FORWARD_IPS.isdisjoint(rdata):
+            remaining = [value for value in rdata if value not in WEB_FORWARD_IPS]
+            values_removed += len(rdata) - len(remaining)
+            if not remaining:
+                rrsets_removed += 1
+                continue
+            record = dict(record, rdata=remaining)
+        kept.append(record)
+    return kept, values_removed, rrsets_removed
+
+def fetch_zone_data(client, zone, fetch_web_forwards=True, zone_properties=None, stats=None):
+    """Fetch everything the JSON export stores for a single zone.
+
+    zone_properties, if the caller already fetched them from /v3/zones/{name},
+    save fetching them again for secondary zones. If stats is a dict, the
+    numbers of web forward values and rrsets removed from a zone that had any
+    are stored in it, for the zone's manifest entry.
+
+    With fetch_web_forwards unset, a zone that has web forwards is returned
+    with "webForwards" set to None, for the caller to fetch separately and
+    fill in (or delete, if there turn out to be none).
+    """
+    zone_name = zone["properties"]["name"]
+    zone_type = zone["properties"]["type"]
+    if zone_type == "SECONDARY":
+        zone_properties = zone_properties or get_zone_properties(client, zone_name)
+        primary_ns = zone_properties["primaryNameServers"]
+        zone_secondary_data = {
+            "zoneName": zone_name,
+            "type": "SECONDARY",
+            "primaryNameServers": primary_ns
+        }
+        return zone_secondary_data
+    elif zone_type == "ALIAS":
+        zone_alias_data = {
+            "zoneName": zone["properties"]["name"],
+            "type": "ALIAS",
+            "originalZoneName": zone["originalZoneName"]
+        }
+        return zone_alias_data
+    else:
+        # Exclude system-generated A records for final storage; if there were any, the zone has web forwards
+        rrsets, values_removed, rrsets_removed = filter_web_forward_records(get_rrsets_for_zone(client, zone_name))
+
+        zones_primary_data = {
+            "zoneName": zone_name,
+            "type": "PRIMARY",
+            "rrSets": rrsets
+        }
+        if values_removed:
+            client.metrics.increment("web_forward_zones")
+            client.metrics.increment("web_forward_values_removed", values_removed)
+            client.metrics.increment("web_forward_rrsets_removed", rrsets_removed)
+            if stats is not None:
+                stats.update(web_forward_values_removed=values_removed, web_forward_rrsets_removed=rrsets_removed)
+            if not fetch_web_forwards:
+                zones_primary_data["webForwards"] = None
+            else:
+                web_forwards = get_web_forwards_for_zone(client, zone_name)
+                if web_forwards:
+                    zones_primary_data["webForwards"] = web_forwards
+
+        return zones_primary_data
+
+def main(username=None, password=None, token=None, refresh_token="", combined_file=False, json_output=False, debug=False, zones_file=None, max_inflight=4, max_wait=3600, workers=8, compact_json=False, manifest_path="zexport_manifest.json", resume=False, incremental=False, host="api.ultradns.com", metrics=None, columnar=False, sqlite_path=None, rate_limit=None):
+    metrics = metrics or Metrics()
+    # JSON exports fetch rrsets and web forwards on separate pools of workers
+    client = ZexportConnection(pool_size=max(workers * 2, max_inflight), metrics=metrics, rate_limit=rate_limit, host=host)
     if token:
         client.access_token = token
         client.refresh_token = refresh_token
     else:
-        client.auth(username, password)
+        with metrics.stage("auth"):
+            client.auth(username, password)
 
-    zones = get_zones(client)
+    listed = {}
+    if zones_file and not incremental:
+        # Only the zones in the file are needed, so the account isn't listed at all.
+        # JSON mode looks each zone's properties up as it goes.
+        zone_names = list(dict.fromkeys(name if name.endswith('.') else name + '.' for name in get_zones_from_file(zones_file)))
+        zones = [{"properties": {"name": zone_name}} for zone_name in zone_names]
+        total = len(zones)
+        single_zone = total == 1
+        listing_complete = False
+    else:
+        listing = ZoneListing(client)
+        total = listing.total()
+
+        def record_fingerprints(zones):
+            for zone in zones:
+                listed[zone['properties']['name']] = zone_fingerprint(zone)
+                yield zone
+
+        zones = record_fingerprints(listing)
+        if zones_file:
+            # Ensure zone names are stripped of trailing dots for comparison
+            wanted = {name.rstrip('.') for name in get_zones_from_file(zones_file)}
+            zones = (zone for zone in zones if zone['properties']['name'].rstrip('.') in wanted)
+            total = len(wanted)
+        single_zone = bool(zones_file) and total == 1
+        listing_complete = True
 
-    if zones_file:
-        zone_file_names = get_zones_from_file(zones_file)
-        # Ensure zone_names are stripped of trailing dots for comparison
-        zone_file_names = [name.rstrip('.') for name in zone_file_names]
-        # Iterate in reverse to safely remove items while iterating
-        for i in reversed(range(len(zones))):
-            zone_name = zones[i]['properties']['name'].rstrip('.')
-            if zone_name not in zone_file_names:
-                del zones[i]
+    mode = "json" if json_output else "combined" if combined_file else "bind"
+    manifest = Manifest.load(manifest_path, mode) if resume else None
+    # The file the interrupted run was writing to; a JSON run that got as far as renaming it may not have marked the manifest complete
+    output_path = "zones_data.json.partial" if json_output else "combined_zone_file.conf" if combined_file else None
+    if resume and manifest is None:
+        print(f"No unfinished {mode} export found in {manifest_path}, starting from the beginning.")
+    elif manifest is not None and output_path and not os.path.exists(output_path):
+        print(f"{output_path}, which the interrupted run was writing, is gone, starting from the beginning.")
+        manifest = None
+    resumed = manifest is not None
+    if not resumed:
+        previous = Manifest.load(manifest_path, mode, complete=True) if incremental else None
+        if incremental and previous is None:
+            print(f"No finished {mode} export found in {manifest_path}, exporting every zone.")
+        elif json_output and incremental and (previous.data["json"]["compact"] != compact_json or not os.path.exists("zones_data.json")):
+            print("The previous zones_data.json is missing or was written with a different --compact setting, exporting every zone.")
+            previous = None
+        manifest = Manifest(manifest_path, mode)
+    manifest.fingerprints = listed
+
+    if resumed:
+        zones = (zone for zone in zones if not manifest.is_done(zone['properties']['name']))
+        if total is not None:
+            total = max(total - len(manifest), 0)
+            print(f"Resuming: {len(manifest)} zones already exported, about {total} remaining.")
+        else:
+            print(f"Resuming: {len(manifest)} zones already exported.")
+    elif previous is not None:
+        # Deleted zones can only be told apart once the whole account has been listed
+        zones = list(zones)
+        unchanged, deleted = carry_forward(previous, manifest, listed)
+        carry = manifest.data.get("carry", {})
+        zones = [zone for zone in zones if not manifest.is_done(zone['properties']['name'])]
+        total = len(zones)
+        changed = sum(1 for zone in zones if zone['properties']['name'] not in carry)
+        print(f"Incremental export: {unchanged} zones unchanged, {deleted} deleted upstream, {changed} new or changed.")
 
     if json_output:
-        zones_data = []
-        web_forward_ips = ["204.74.99.100", "204.74.99.101", "204.74.99.102", "204.74.99.103"]
-
-        for zone in tqdm(zones, desc="Fetching data for zones"):
-            zone_name = zone["properties"]["name"]
-            zone_type = zone["properties"]["type"]
-            if zone_type == "SECONDARY":
-                zone_properties = get_zone_properties(client, zone_name)
-                primary_ns = zone_properties["primaryNameServers"]
-                zone_secondary_data = {
-                    "zoneName": zone_name,
-                    "type": "SECONDARY",
-                    "primaryNameServers": primary_ns
-                }
-                zones_data.append(zone_secondary_data)
-            elif zone_type == "ALIAS":
-                zone_alias_data = {
-                    "zoneName": zone["properties"]["name"],
-                    "type": "ALIAS",
-                    "originalZoneName": zone["originalZoneName"]
-                }
-                zones_data.append(zone_alias_data)
-            else:
-                rrsets = get_rrsets_for_zone(client, zone_name)
-
-                # Check if any of the system-generated A records are present in the RRsets
-                should_fetch_web_forwards = any(
-                    record for record in rrsets if (
-                            record["rrtype"] == "A (1)" and
-                            "rdata" in record and
-                            record["rdata"][0] in web_forward_ips
-                    )
-                )
-
-                # If a system-generated A record is detected, fetch the web forwards
-                web_forwards = []
-                if should_fetch_web_forwards:
-                    web_forwards = get_web_forwards_for_zone(client, zone_name)
-
-                # Exclude system-generated A records for final storage
-                rrsets = [record for record in rrsets if not (
-                        record["rrtype"] == "A (1)" and
-                        "rdata" in record and
-                        record["rdata"][0] in web_forward_ips
-                )]
-
-                zones_primary_data = {
-                    "zoneName": zone_name,
-                    "type": "PRIMARY",
-                    "rrSets": rrsets
-                }
-                if web_forwards:
-                    zones_primary_data["webForwards"] = web_forwards
+        partial_path = "zones_data.json.partial"
+        if resumed:
+            state = manifest.data["json"]
+            writer = ZoneJsonWriter(partial_path, state["username"], state["timestamp"], state["compact"], state["offset"], len(manifest))
+        else:
+            timestamp = int(datetime.datetime.now().timestamp())
+            writer = ZoneJsonWriter(partial_path, username, timestamp, compact_json)
+            manifest.data["json"] = {"username": username, "timestamp": timestamp, "compact": compact_json, "offset": writer.offset}
+            manifest.save(force=True)
+
+        columnar_out = None
+        if columnar:
+            state = manifest.data["json"]
+            columnar_out = ZoneColumnarWriter("zones_data.zcol.partial", state["username"], state["timestamp"])
+        store = ZoneStore(sqlite_path) if sqlite_path else None
+
+        if resumed and (columnar_out or store):
+            # The columnar dataset is rebuilt from scratch, and the store may be behind the manifest,
+            # so catch both up with the zones the interrupted run wrote
+            with metrics.stage("replay"), open(partial_path, "rb") as partial_file:
+                for zone_name, info in manifest.data["zones"].items():
+                    # The listing is still streaming in, so use the fingerprints the manifest recorded
+                    stored = store is None or store.has(zone_name, info.get("fingerprint"))
+                    if columnar_out is None and stored:
+                        continue
+                    partial_file.seek(info["offset"])
+                    zone_data = json.loads(partial_file.read(info["length"]))
+                    if columnar_out:
+                        columnar_out.add_zone(zone_data)
+                    if not stored:
+                        store.upsert_zone(zone_data, info.get("fingerprint"))
 
-                zones_data.append(zones_primary_data)
+        carry = manifest.data.get("carry", {})
 
-        with open("zones_data.json", "w") as out_file:
-            json.dump({
-                "username": username,
-                "timestamp": int(datetime.datetime.now().timestamp()),
-                "zones": zones_data
-            }, out_file, indent=4)
+        def export_zone(zone):
+            zone_name = zone['properties']['name']
+            if zone_name in carry:
+                # Unchanged since the previous run, copy it out of the old document
+                info = carry[zone_name]
+                stats = {key: info[key] for key in WEB_FORWARD_STATS if key in info}
+                with metrics.stage("reuse"), open("zones_data.json", "rb") as previous_file:
+                    previous_file.seek(info["offset"])
+                    return zone_name, previous_file.read(info["length"]).decode("ascii"), None, stats
+            zone_properties = None
+            stats = {}
+            with metrics.stage("fetch"):
+                if "type" not in zone['properties']:
+                    # Named in the zones file, so it wasn't listed
+                    try:
+                        zone = zone_properties = get_zone_properties(client, zone_name)
+                    except requests.HTTPError as e:
+                        print(f"Warning: Unable to fetch properties for {zone_name}. HTTP Error: {e.response.status_code}. Skipping...")
+                        return zone_name, None, None, None
+                    listed[zone_name] = zone_fingerprint(zone)
+                zone_data = fetch_zone_data(client, zone, fetch_web_forwards=False, zone_properties=zone_properties, stats=stats)
+            if "webForwards" in zone_data:
+                # Looked up on a pool of their own, so this worker can go on to the next zone's rrsets
+                return forwards_executor.submit(add_web_forwards, zone_name, zone_data, stats)
+            with metrics.stage("encode"):
+                return zone_name, writer.encode_zone(zone_data), zone_data, stats
+
+        def add_web_forwards(zone_name, zone_data, stats):
+            with metrics.stage("web_forwards"):
+                web_forwards = get_web_forwards_for_zone(client, zone_name)
+            if web_forwards:
+                zone_data["webForwards"] = web_forwards
+            else:
+                del zone_data["webForwards"]
+            with metrics.stage("encode"):
+                return zone_name, writer.encode_zone(zone_data), zone_data, stats
+
+        with ThreadPoolExecutor(max_workers=workers) as executor, ThreadPoolExecutor(max_workers=workers) as forwards_executor, writer, columnar_out or nullcontext():
+            results = bounded_map(executor, export_zone, zones, workers * 2)
+            for result in tqdm(results, total=total, desc="Fetching data for zones"):
+                zone_name, text, zone_data, stats = result.result() if isinstance(result, Future) else result
+                if text is None:
+                    continue
+                with metrics.stage("write"):
+                    offset, length = writer.write_encoded(text)
+                # Zones carried over by --incremental are only loaded if the store doesn't have them yet
+                load = store and (zone_data is not None or not store.has(zone_name, listed.get(zone_name)))
+                if zone_data is None and (columnar_out or load):
+                    zone_data = json.loads(text)
+                if columnar_out:
+                    with metrics.stage("columnar"):
+                        columnar_out.add_zone(zone_data)
+                if load:
+                    with metrics.stage("sqlite"):
+                        store.upsert_zone(zone_data, listed.get(zone_name))
+                manifest.mark_done(zone_name, file="zones_data.json", offset=offset, length=length, **stats)
+                manifest.data["json"]["offset"] = writer.offset
+                if time.monotonic() - manifest.last_saved >= manifest.save_interval:
+                    writer.flush()
+                    if store:
+                        store.commit()
+                    manifest.save()
+        if store and listing_complete:
+            with metrics.stage("sqlite"):
+                removed = store.prune(listed)
+                store.close()
+            print(f"Zone store {sqlite_path} updated, {removed} deleted zone(s) removed.")
+        elif store:
+            # Without the account listing there's no telling which zones were deleted
+            store.close()
+            print(f"Zone store {sqlite_path} updated.")
+        if columnar_out:
+            os.replace("zones_data.zcol.partial", "zones_data.zcol")
+        # Nothing may come between these two; if the run dies after the rename, --resume starts over
+        os.replace(partial_path, "zones_data.json")
+        manifest.finish()
         return
 
-    zone_names = [z['properties']['name'] for z in zones]
+    files = None
+    if not combined_file:
+        # Files left by an earlier run are only rewritten if their contents changed.
+        # This run's manifest hasn't been saved yet, so the earlier one is still on disk.
+        earlier = None if resumed else Manifest.load(manifest_path, mode, complete=None)
+        files = ZoneFileCache(earlier.data["zones"] if earlier else {})
+
+    zone_names = (z['properties']['name'] for z in zones)
     # If you want to exclude particular domains from your request, add them here
-    # zone_names = [zone for zone in zone_names if zone != "example1.com." and zone != "example2.com."]
-    combined_zone_data = []
-
-    if debug or len(zone_names) == 1:
-        for zone in tqdm(zone_names, desc="Processing zones individually"):
-            task_id = initiate_zone_export(client, [zone])
-            status = poll_task_status(client, task_id, debug=True)
-            if not status:  # If the task status returned None (meaning there was an error)
-                continue
-            data = download_exported_data(client, task_id)
-            save_zone_to_file(zone, data)
-            
-    else:
-        for i in tqdm(range(0, len(zone_names), 250), desc="Processing zones"):
-            chunk = zone_names[i:i+249]
-            task_id = initiate_zone_export(client, chunk)
-            poll_task_status(client, task_id)
-            zip_data = download_exported_data(client, task_id)
-
-            with zipfile.ZipFile(BytesIO(zip_data), 'r') as zip_ref:
-                for file in zip_ref.namelist():
-                    domain_name = file.replace(".txt", "")
-                    with zip_ref.open(file, 'r') as textf:
-                        content = textf.read().decode('utf-8')
-                        if combined_file:
-                            combined_zone_data.append(content)
-                        else:
-                            save_zone_to_file(domain_name, content)
-
-    if combined_file:
-        with open("combined_zone_file.conf", "w") as out_file:
-            out_file.write("\n".join(combined_zone_data))
+    # zone_names = (zone for zone in zone_names if zone != "example1.com." and zone != "example2.com.")
+
+    failed_zones = []
+    with open("combined_zone_file.conf", "r+b" if resumed else "wb") if combined_file else nullcontext() as combined_out:
+        if combined_out is not None:
+            # Cut off anything an interrupted run wrote after its last recorded batch
+            combined_out.seek(manifest.data.get("combined_offset", 0))
+            combined_out.truncate()
+
+        # total may only be an estimate, so only a zones file naming a single zone takes this path.
+        # A batch that ends up holding one zone is fine too, download_batch handles its plain-text result.
+        if debug or single_zone:
+            for zone in tqdm(zone_names, total=total, desc="Processing zones individually"):
+                try:
+                    task_id = initiate_zone_export(client, [zone])
+                except requests.HTTPError as e:
+                    response = rejected_export(e)
+                    if response is None:
+                        raise
+                    tqdm.write(f"Warning: An error occurred processing {zone}: {json.dumps(response)}")
+                    continue
+                with metrics.stage("task_wait"):
+                    status = poll_task_status(client, task_id, debug=True, max_wait=max_wait)
+                if not status:  # If the task status returned None (meaning there was an error)
+                    continue
+                combined_zones, saved, timings = download_batch(client, task_id, [zone], combined_out is not None, files)
+                metrics.add_stage_time("download", timings["download"])
+                metrics.add_stage_time("unpack", timings["unpack"])
+                failed_zones.extend(record_batch(manifest, [zone], saved, combined_zones, combined_out))
+        else:
+            failed_zones = run_batch_exports(client, batched(zone_names, 250), manifest, combined_out, max_inflight, max_wait, total, files)
+
+    if failed_zones:
+        print(f"\n{len(failed_zones)} zone(s) could not be exported:")
+        for zone, response in failed_zones:
+            print(f"  {zone}: {response.get('message', json.dumps(response))}")
+
+    if files:
+        added, changed, unchanged = manifest.change_summary()
+        print(f"Zone files: {added} added, {changed} changed, {unchanged} unchanged. Added, changed and deleted zones are listed under \"changes\" in {manifest_path}.")
+    manifest.finish()
 
 if __name__ == "__main__":
     parser = CustomHelpParser(description="UltraDNS Zone Exporter")
@@ -269,10 +1687,23 @@ if __name__ == "__main__":
     auth_group.add_argument("-p", "--password", help="Password for authentication")
     auth_group.add_argument("-t", "--token", help="Directly pass the Bearer token")
     auth_group.add_argument("-r", "--refresh-token", help="Pass the Refresh token (optional with --token)")
+    auth_group.add_argument("--host", default="api.ultradns.com", help="API host, optionally with an http:// or https:// prefix (default: api.ultradns.com)")
     
     parser.add_argument("-c", "--combined-file", action="store_true", help="Combine all zone data into a single file")
     parser.add_argument("-j", "--json", action="store_true", help="Save RRsets for all zones into a single JSON object")
+    parser.add_argument("--compact", action="store_true", help="Write the JSON output without indentation")
+    parser.add_argument("--columnar", action="store_true", help="Also write zones_data.zcol, a compact columnar dataset with one row per record, in JSON mode")
+    parser.add_argument("--sqlite", metavar="PATH", help="Also load the JSON export into a SQLite database at PATH, updating it in place on later runs")
     parser.add_argument("-d", "--debug", action="store_true", help="Fetch zones individually to identify potential errors.")
+    parser.add_argument("-m", "--max-inflight", type=int, default=4, help="Maximum number of batch export tasks to keep running at once (default: 4)")
+    parser.add_argument("-W", "--workers", type=int, default=8, help="Number of zones to fetch concurrently in JSON mode (default: 8)")
+    parser.add_argument("--rate-limit", type=float, help="Maximum API requests per second, shared by all workers (default: no limit)")
+    parser.add_argument("-w", "--max-wait", type=int, default=3600, help="Seconds to wait for an export task before giving up (default: 3600)")
+    parser.add_argument("--manifest", default="zexport_manifest.json", help="Path of the checkpoint manifest recording exported zones (default: zexport_manifest.json)")
+    parser.add_argument("--resume", action="store_true", help="Skip zones already exported by an interrupted run recorded in the manifest")
+    parser.add_argument("-i", "--incremental", action="store_true", help="Only export zones that changed since the last finished run recorded in the manifest")
+    parser.add_argument("--metrics-file", default="zexport_metrics.json", help="Where to write the JSON run report with request and stage metrics (default: zexport_metrics.json)")
+    parser.add_argument("--prometheus-file", help="Also write the run report in Prometheus text format to this file")
     parser.add_argument("-z", "--zones-file", help="Specify a file containing a list of zones to export (one per line). If not specified, all zones will be exported.")
 
     args = parser.parse_args()
@@ -288,5 +1719,32 @@ if __name__ == "__main__":
     else:
         parser.error("You must provide either a token, or both a username and password.")
 
-    main(args.username, args.password, args.token, args.refresh_token, args.combined_file, args.json, args.debug, args.zones_file)
+    if args.incremental and args.combined_file:
+        parser.error("--incremental cannot be used with --combined-file.")
+    if args.columnar and not args.json:
+        parser.error("--columnar requires --json.")
+    if args.columnar:
+        try:
+            load_zonereader()
+        except FileNotFoundError:
+            parser.error("--columnar needs utils/zonereader.py from the same checkout as zexport.py.")
+    if args.sqlite and not args.json:
+        parser.error("--sqlite requires --json.")
+    if args.max_inflight < 1:
+        parser.error("--max-inflight must be at least 1.")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if args.rate_limit is not None and args.rate_limit <= 0:
+        parser.error("--rate-limit must be greater than 0.")
+
+    metrics = Metrics()
+    try:
+        main(args.username, args.password, args.token, args.refresh_token, args.combined_file, args.json, args.debug, args.zones_file, args.max_inflight, args.max_wait, args.workers, args.compact, args.manifest, args.resume, args.incremental, args.host, metrics, args.columnar, args.sqlite, args.rate_limit)
+    except BaseException:
+        metrics.status = "failed"
+        raise
+    finally:
+        metrics.write_json(args.metrics_file)
+        if args.prometheus_file:
+            metrics.write_prometheus(args.prometheus_file)
 
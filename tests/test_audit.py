@@ -0,0 +1,92 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import audit
+from zexport import ZoneColumnarWriter, ZoneJsonWriter
+
+def make_zones(count, seed=0):
+    """Zones with a bit of everything the report looks at, CNAME chains, loops and dangling targets included."""
+    rng = random.Random(seed)
+    zones = []
+    for index in range(count):
+        zone_name = f"zone{index:04d}.example."
+        if index % 11 == 3:
+            zones.append({"zoneName": zone_name, "type": "SECONDARY", "primaryNameServers": {"nameServerIpList": {}}})
+            continue
+        if index % 11 == 7:
+            zones.append({"zoneName": zone_name, "type": "ALIAS", "originalZoneName": "zone0000.example."})
+            continue
+        if index % 11 == 9:
+            # What get_rrsets_for_zone returns for a zone it couldn't fetch
+            zones.append({"zoneName": zone_name, "type": "PRIMARY", "rrSets": []})
+            continue
+        rrsets = [
+            {"ownerName": zone_name, "rrtype": "SOA (6)", "ttl": 86400, "rdata": [f"ns1.example. hostmaster.example. {index} 10800 3600 604800 300"]},
+            {"ownerName": zone_name, "rrtype": "MX (15)", "ttl": 300, "rdata": [f"{rng.choice([10, 20])} mx{rng.randrange(3)}.example.net."]},
+            {"ownerName": zone_name, "rrtype": "TXT (16)", "ttl": 300, "rdata": [rng.choice(["v=spf1 -all", "v=DMARC1; p=none", "hello"])]},
+            {"ownerName": f"www.{zone_name}", "rrtype": "A (1)", "ttl": 300, "rdata": ["192.0.2.1"]},
+            {"ownerName": f"deep.a.b.{zone_name}", "rrtype": "AAAA (28)", "ttl": 300, "rdata": ["2001:db8::1"]}
+        ]
+        if index % 4 == 0:
+            rrsets.append({"ownerName": zone_name, "rrtype": "DNSKEY (48)", "ttl": 300, "rdata": ["257 3 13 AAAA"]})
+        for label in range(3):
+            target = rng.choice([
+                f"www.zone{rng.randrange(count):04d}.example.",
+                f"c{rng.randrange(3)}.zone{rng.randrange(count):04d}.EXAMPLE",
+                f"missing.zone{rng.randrange(count):04d}.example.",
+                "elsewhere.example.net."
+            ])
+            rrsets.append({"ownerName": f"c{label}.{zone_name}", "rrtype": "CNAME (5)", "ttl": 300, "rdata": [target]})
+        zones.append({"zoneName": zone_name, "type": "PRIMARY", "rrSets": rrsets})
+    # A loop spanning two zones
+    zones[0]["rrSets"].append({"ownerName": "loop.zone0000.example.", "rrtype": "CNAME (5)", "ttl": 300, "rdata": ["loop.zone0001.example."]})
+    zones[1]["rrSets"].append({"ownerName": "loop.zone0001.example.", "rrtype": "CNAME (5)", "ttl": 300, "rdata": ["loop.zone0000.example."]})
+    return zones
+
+class JobsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.zones = make_zones(150)
+        cls.paths = {}
+        for name, compact in (("indented.json", False), ("compact.json", True)):
+            cls.paths[name] = os.path.join(cls.directory.name, name)
+            with ZoneJsonWriter(cls.paths[name], "tester", 1700000000, compact) as writer:
+                for zone in cls.zones:
+                    writer.write_zone(zone)
+        cls.paths["zones.ndjson"] = os.path.join(cls.directory.name, "zones.ndjson")
+        with open(cls.paths["zones.ndjson"], "w") as f:
+            f.writelines(json.dumps(zone) + "\n" for zone in cls.zones)
+        cls.paths["zones.zcol"] = os.path.join(cls.directory.name, "zones.zcol")
+        with ZoneColumnarWriter(cls.paths["zones.zcol"], "tester", 1700000000) as writer:
+            for zone in cls.zones:
+                writer.add_zone(zone)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def report(self, path, jobs):
+        report = audit.generate_audit_report(None, engine=audit.analyze_file(path, jobs))
+        del report["General Information"]["Date of Report"]
+        return report
+
+    def test_report_is_the_same_for_every_job_count(self):
+        expected = audit.generate_audit_report(self.zones)
+        del expected["General Information"]["Date of Report"]
+        # The fixture should exercise every part of the CNAME analysis
+        self.assertTrue(all(expected["CNAME Records Analysis"].values()))
+        for name, path in self.paths.items():
+            for jobs in (1, 2, 3, 5):
+                with self.subTest(file=name, jobs=jobs):
+                    self.assertEqual(self.report(path, jobs), expected)
+
+if __name__ == "__main__":
+    unittest.main()
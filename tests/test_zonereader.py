@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import zonereader
+from zexport import ZoneColumnarWriter, ZoneJsonWriter
+from zonereader import iter_zones, iter_zones_in_range, shard_ranges, zone_layout
+
+HEADER = {"username": "tester", "timestamp": 1700000000}
+
+def make_zones(count):
+    zones = []
+    for index in range(count):
+        zone_name = f"zone{index:04d}.example."
+        zone = {"zoneName": zone_name, "type": "PRIMARY", "rrSets": [
+            {"ownerName": zone_name, "rrtype": "SOA (6)", "ttl": 86400,
+             "rdata": [f"ns1.example. hostmaster.example. {2024010100 + index} 10800 3600 604800 300"]},
+            {"ownerName": f"www.{zone_name}", "rrtype": "TXT (16)", "ttl": 300,
+             "rdata": ["{ \"braces\": [1, 2] }, and \\ escapes", "x" * (index * 37 % 500)]}
+        ]}
+        if index % 5 == 0:
+            zone = {"zoneName": zone_name, "type": "ALIAS", "originalZoneName": "zone0000.example."}
+        zones.append(zone)
+    return zones
+
+class ZoneReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.zones = make_zones(40)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def export(self, name, zones=None, compact=False):
+        # Written by zexport.py's own writer, whose layout the shard markers depend on
+        path = os.path.join(self.directory.name, name)
+        with ZoneJsonWriter(path, HEADER["username"], HEADER["timestamp"], compact) as writer:
+            for zone in self.zones if zones is None else zones:
+                writer.write_zone(zone)
+        return path
+
+    def indented(self, zones=None):
+        return self.export("zones_data.json", zones)
+
+    def compact(self):
+        return self.export("compact.json", compact=True)
+
+    def ndjson(self, zones=None):
+        path = os.path.join(self.directory.name, "zones.ndjson")
+        lines = [json.dumps(HEADER)] + [json.dumps(zone) for zone in (self.zones if zones is None else zones)]
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def read(self, path):
+        header = {}
+        return list(iter_zones(path, header)), header
+
+    def test_round_trips(self):
+        for path, layout in [(self.indented(), "indented"), (self.compact(), "other"), (self.ndjson(), "ndjson")]:
+            with self.subTest(layout=layout):
+                zones, header = self.read(path)
+                self.assertEqual(zones, self.zones)
+                self.assertEqual(header, HEADER)
+                self.assertEqual(zone_layout(path), layout)
+
+    def test_empty_export(self):
+        path = self.indented(zones=[])
+        self.assertEqual(self.read(path), ([], HEADER))
+        self.assertEqual(zone_layout(path), "indented")
+
+    def test_values_spanning_chunk_boundaries(self):
+        # With tiny chunks, every zone, string and number is split across reads
+        for chunk_size in (1, 7, 64):
+            with self.subTest(chunk_size=chunk_size), mock.patch.object(zonereader, "CHUNK_SIZE", chunk_size):
+                for path in (self.indented(), self.compact()):
+                    self.assertEqual(self.read(path), (self.zones, HEADER))
+
+    def test_shards_yield_every_zone_once(self):
+        names = [zone["zoneName"] for zone in self.zones]
+        for path, layout in [(self.indented(), "indented"), (self.ndjson(), "ndjson")]:
+            size = os.path.getsize(path)
+            for count in (1, 2, 3, 7, 40, 200, size):
+                with self.subTest(layout=layout, count=count):
+                    found = [zone["zoneName"] for start, end in shard_ranges(path, count)
+                             for zone in iter_zones_in_range(path, layout, start, end)]
+                    self.assertEqual(found, names)
+
+    def test_shard_boundaries_at_every_offset(self):
+        # Split the file in two at every byte offset
+        zones = self.zones[:4]
+        expected = [zone["zoneName"] for zone in zones]
+        for layout, path in [("indented", self.indented(zones)), ("ndjson", self.ndjson(zones))]:
+            size = os.path.getsize(path)
+            for split in range(size + 1):
+                found = [zone["zoneName"] for start, end in [(0, split), (split, size)]
+                         for zone in iter_zones_in_range(path, layout, start, end)]
+                self.assertEqual(found, expected, f"{layout} split at {split}")
+
+class ColumnarTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "zones_data.zcol")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        def primary(name, ttl):
+            return {"zoneName": name, "type": "PRIMARY", "rrSets": [
+                {"ownerName": name, "rrtype": "A (1)", "ttl": ttl, "rdata": ["192.0.2.1", "192.0.2.2"]},
+                {"ownerName": f"www.{name}", "rrtype": "CNAME (5)", "ttl": ttl + 1, "rdata": [name]}
+            ]}
+        zones = [
+            {"zoneName": "empty0.example.", "type": "PRIMARY", "rrSets": []},
+            primary("a.example.", 300),
+            {"zoneName": "empty1.example.", "type": "PRIMARY", "rrSets": []},
+            {"zoneName": "secondary.example.", "type": "SECONDARY", "primaryNameServers": {}},
+            primary("b.example.", 60),
+            {"zoneName": "empty2.example.", "type": "PRIMARY", "rrSets": []}
+        ]
+        # Tiny row groups, so empty zones fall on row group boundaries too
+        for row_group_size in (1, 2, 3, 1000):
+            with self.subTest(row_group_size=row_group_size):
+                with ZoneColumnarWriter(self.path, "tester", 1700000000, row_group_size) as writer:
+                    for zone in zones:
+                        writer.add_zone(zone)
+                header = {}
+                found = list(iter_zones(self.path, header))
+                self.assertEqual(header, HEADER)
+                # Only the bare rrtype is stored, and nothing but rrsets
+                expected = [dict(zone, rrSets=[dict(rrset, rrtype=rrset["rrtype"].split(" ")[0]) for rrset in zone["rrSets"]])
+                            if "rrSets" in zone else {"zoneName": zone["zoneName"], "type": zone["type"]} for zone in zones]
+                self.assertEqual(found, expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,124 +1,600 @@
 #!/usr/bin/env python3
 
-import json
 import collections
 import datetime
 import sys
 import argparse
 import random
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from termcolor import colored
 from argparse import RawTextHelpFormatter
+from zonereader import iter_zones, zone_layout, shard_ranges, iter_zones_in_range, normalize_name, batched, bounded_map
+
+# Shards per job when splitting a file, so a slow shard doesn't leave the other processes idle
+SHARDS_PER_JOB = 4
+# Zones per chunk handed to a worker when a file can't be split by offset
+CHUNK_ZONES = 2000
 
 # Define a list of colors supported by termcolor
 COLORS = ["grey", "red", "green", "yellow", "blue", "magenta", "cyan", "white"]
 
+# Sections whose nested results are printed under their own names, since the
+# names of their entries alone don't say which result they belong to
+LABELLED_SECTIONS = {"CNAME Records Analysis"}
+
 def print_section(title, content):
     random_color = random.choice(COLORS)
     print(colored(f"\n{title}\n{'-' * len(title)}", random_color))
     
     for key, value in content.items():
         if isinstance(value, dict):
+            if title in LABELLED_SECTIONS:
+                print(f"{key}:")
             for sub_key, sub_value in value.items():
                 print(f"{sub_key}: {sub_value}")
         else:
             print(f"{key}: {value}")
 
+class Analyzer(ABC):
+    """A single audit analysis, fed every zone by AuditEngine in one pass.
+
+    add_zone sees every zone. add is called once per zone and record type
+    with that zone's rrsets of the type, for the bare record types (e.g.
+    {"MX"}) listed in rrtypes; None means every type. Analyzers that set
+    uses_index receive the ZoneIndex built during the pass when their result
+    is requested.
+
+    Analyzers run over shards of the zones in separate processes are combined
+    with merge, which must give the same result as if the other analyzer's
+    zones had been fed to this one after its own.
+
+    An analyzer that needs to know whether some names own an rrset, without
+    keeping every owner name it is fed, returns them from lookups once the
+    pass is over. A second pass over the zones then hands the ones that do
+    to add_owners.
+    """
+    rrtypes = None
+    uses_index = False
+
+    def add_zone(self, zone):
+        pass
+
+    def add(self, zone_name, rrtype, rrsets):
+        pass
+
+    def lookups(self):
+        return set()
+
+    def add_owners(self, owners):
+        pass
+
+    @abstractmethod
+    def merge(self, other):
+        pass
+
+    @abstractmethod
+    def result(self, index=None):
+        pass
+
+class ZoneIndex:
+    """rrsets of every zone, indexed by bare record type, owner name and zone name."""
+
+    def __init__(self):
+        self.by_type = collections.defaultdict(list)
+        self.by_owner = collections.defaultdict(list)
+        self.by_zone = collections.defaultdict(list)
+
+    def add(self, zone_name, rrtype, rrsets):
+        self.by_type[rrtype].extend(rrsets)
+        self.by_zone[zone_name].extend(rrsets)
+        for rrset in rrsets:
+            self.by_owner[rrset['ownerName']].append(rrset)
+
+    def merge(self, other):
+        for mine, theirs in ((self.by_type, other.by_type), (self.by_owner, other.by_owner), (self.by_zone, other.by_zone)):
+            for key, rrsets in theirs.items():
+                mine[key].extend(rrsets)
+
+class AuditEngine:
+    """Walk every zone once, grouping its rrsets by record type and handing each group only to the analyzers that want it."""
+
+    def __init__(self, analyzers):
+        self.analyzers = analyzers
+        self.index = ZoneIndex() if any(analyzer.uses_index for analyzer in analyzers) else None
+        self.dispatch = {}
+        self.rrtype_names = {}
+
+    def _analyzers_for(self, rrtype):
+        analyzers = self.dispatch.get(rrtype)
+        if analyzers is None:
+            analyzers = [analyzer for analyzer in self.analyzers if analyzer.rrtypes is None or rrtype in analyzer.rrtypes]
+            self.dispatch[rrtype] = analyzers
+        return analyzers
+
+    def feed(self, zones):
+        rrtype_names = self.rrtype_names
+        for zone in zones:
+            for analyzer in self.analyzers:
+                analyzer.add_zone(zone)
+            if 'rrSets' not in zone:
+                continue
+            groups = {}
+            for rrset in zone['rrSets']:
+                # "MX (15)" -> "MX", parsed once per distinct rrtype string
+                rrtype = rrtype_names.get(rrset['rrtype'])
+                if rrtype is None:
+                    rrtype = rrtype_names[rrset['rrtype']] = rrset['rrtype'].split(" ")[0]
+                group = groups.get(rrtype)
+                if group is None:
+                    groups[rrtype] = [rrset]
+                else:
+                    group.append(rrset)
+            zone_name = zone['zoneName']
+            for rrtype, rrsets in groups.items():
+                for analyzer in self._analyzers_for(rrtype):
+                    analyzer.add(zone_name, rrtype, rrsets)
+                if self.index is not None:
+                    self.index.add(zone_name, rrtype, rrsets)
+        return self
+
+    def merge(self, other):
+        """Fold in an engine with the same kinds of analyzers that was fed the zones following this one's."""
+        for analyzer, other_analyzer in zip(self.analyzers, other.analyzers):
+            analyzer.merge(other_analyzer)
+        if self.index is not None:
+            self.index.merge(other.index)
+        return self
+
+    def look_up_owners(self, find):
+        """Run the second pass for the names the analyzers look up, with find(names) returning the ones that own an rrset."""
+        names = set().union(*(analyzer.lookups() for analyzer in self.analyzers))
+        if names:
+            owners = find(names)
+            for analyzer in self.analyzers:
+                analyzer.add_owners(owners)
+        return self
+
+    def __getstate__(self):
+        # The dispatch caches are rebuilt on demand and not worth sending between processes
+        return {"analyzers": self.analyzers, "index": self.index}
+
+    def __setstate__(self, state):
+        self.__init__(state["analyzers"])
+        self.index = state["index"]
+
+    def result(self, analyzer):
+        return analyzer.result(self.index)
+
+class ZoneTypeCounts(Analyzer):
+    rrtypes = set()
+
+    def __init__(self):
+        self.zones = 0
+        self.types = collections.Counter()
+        self.records = 0
+
+    def add_zone(self, zone):
+        self.zones += 1
+        self.types[zone['type']] += 1
+        if 'rrSets' in zone:
+            self.records += len(zone['rrSets'])
+
+    def merge(self, other):
+        self.zones += other.zones
+        self.types.update(other.types)
+        self.records += other.records
+
+    def result(self, index=None):
+        return {
+            "Total Zones": self.zones,
+            "Total PRIMARY Zones": self.types['PRIMARY'],
+            "Total SECONDARY Zones": self.types['SECONDARY'],
+            "Total ALIAS Zones": self.types['ALIAS'],
+            "Total Records": self.records
+        }
+
+class RecordTypeDistribution(Analyzer):
+    def __init__(self):
+        self.types = collections.Counter()
+
+    def add(self, zone_name, rrtype, rrsets):
+        self.types[rrtype] += len(rrsets)
+
+    def merge(self, other):
+        self.types.update(other.types)
+
+    def result(self, index=None):
+        return dict(self.types)
+
+class SubdomainCount(Analyzer):
+    rrtypes = set()
+
+    def __init__(self):
+        self.counts = {}
+
+    def add_zone(self, zone):
+        if 'rrSets' in zone:
+            # Subtract 1 to exclude the main domain
+            self.counts[zone['zoneName']] = len(set(rrset['ownerName'] for rrset in zone['rrSets'])) - 1
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+    def result(self, index=None):
+        return dict(self.counts)
+
+class DeepestSubdomain(Analyzer):
+    rrtypes = set()
+
+    def __init__(self):
+        self.deepest = None
+        self.depth = -1
+
+    def add_zone(self, zone):
+        if not zone.get('rrSets'):
+            return
+        owner = max((rrset['ownerName'] for rrset in zone['rrSets']), key=lambda domain: domain.count("."))
+        if owner.count(".") > self.depth:
+            self.deepest = owner
+            self.depth = owner.count(".")
+
+    def merge(self, other):
+        # Strictly deeper only, so ties go to the earlier zone as in a single pass
+        if other.depth > self.depth:
+            self.deepest = other.deepest
+            self.depth = other.depth
+
+    def result(self, index=None):
+        return self.deepest
+
+class MxDistribution(Analyzer):
+    rrtypes = {"MX"}
+
+    def __init__(self):
+        self.servers = collections.Counter()
+        self.priorities = collections.Counter()
+
+    def add(self, zone_name, rrtype, rrsets):
+        for rrset in rrsets:
+            for rdata in rrset['rdata']:
+                fields = rdata.split()
+                self.servers[fields[-1]] += 1
+                self.priorities[fields[0]] += 1
+
+    def merge(self, other):
+        self.servers.update(other.servers)
+        self.priorities.update(other.priorities)
+
+    def result(self, index=None):
+        return dict(self.servers)
+
+    def priority_result(self):
+        return dict(self.priorities)
+
+class CnameChains(Analyzer):
+    """Resolve every CNAME in the account as one graph of owner -> target edges.
+
+    Chain lengths are found with a single pass of Tarjan's strongly connected
+    components algorithm, so each CNAME and target is visited once however
+    long the chains are. A chain counts each CNAME it passes through once, so
+    a chain that runs into a loop ends after going round it. Names are
+    compared without case or trailing dots, and every rdata value of an rrset
+    is followed.
+
+    Targets in the account that aren't CNAMEs themselves are looked up in a
+    second pass, so the owner names of the whole account are never held in
+    memory.
+    """
+    rrtypes = {"CNAME"}
+
+    def __init__(self):
+        self.cnames = {}
+        self.zones = set()
+        # The names out of lookups that own an rrset
+        self.owners = set()
+
+    def add_zone(self, zone):
+        if zone.get('rrSets'):
+            self.zones.add(normalize_name(zone['zoneName']))
+
+    def add(self, zone_name, rrtype, rrsets):
+        for rrset in rrsets:
+            self.cnames[normalize_name(rrset['ownerName'])] = [normalize_name(target) for target in rrset['rdata']]
+
+    def merge(self, other):
+        self.cnames.update(other.cnames)
+        self.zones.update(other.zones)
+        self.owners.update(other.owners)
+
+    def lookups(self):
+        return {target for targets in self.cnames.values() for target in targets
+                if target not in self.cnames and self._in_account(target)}
+
+    def add_owners(self, owners):
+        self.owners.update(owners)
+
+    def _resolve(self):
+        """Return each CNAME's chain length, its component number and the loops, as lists of CNAMEs."""
+        cnames = self.cnames
+        order = {}
+        low = {}
+        component = {}
+        length = {}
+        loops = []
+        stack = []
+        on_stack = set()
+        for root in cnames:
+            if root in order:
+                continue
+            order[root] = low[root] = len(order)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(cnames[root]))]
+            while work:
+                node, targets = work[-1]
+                for target in targets:
+                    if target not in cnames:
+                        continue
+                    if target not in order:
+                        order[target] = low[target] = len(order)
+                        stack.append(target)
+                        on_stack.add(target)
+                        work.append((target, iter(cnames[target])))
+                        break
+                    if target in on_stack:
+                        low[node] = min(low[node], order[target])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] != order[node]:
+                        continue
+                    # node is the root of a component; everything it leads to outside it is resolved already
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component[member] = node
+                        members.append(member)
+                        if member == node:
+                            break
+                    beyond = max((length[target] for member in members for target in cnames[member]
+                                  if target in cnames and component[target] != node), default=0)
+                    for member in members:
+                        length[member] = len(members) + beyond
+                    if len(members) > 1 or node in cnames[node]:
+                        loops.append(members)
+        return length, component, loops
+
+    def _walk(self, start, length, component):
+        """Follow the chain from start, staying in its loop until it has gone round, then taking the longest way on."""
+        cnames = self.cnames
+        chain = [start]
+        seen = {start}
+        node = start
+        while True:
+            targets = [target for target in cnames[node] if target in cnames and target not in seen]
+            if not targets:
+                return chain
+            same = [target for target in targets if component[target] == component[node]]
+            node = same[0] if same else max(targets, key=length.__getitem__)
+            chain.append(node)
+            seen.add(node)
+
+    def _in_account(self, name):
+        """Whether name is at or below the apex of one of the zones fed in."""
+        while name:
+            if name in self.zones:
+                return True
+            name = name.partition(".")[2]
+        return False
+
+    def result(self, index=None):
+        length, component, loops = self._resolve()
+
+        longest = {}
+        if length:
+            start = max(self.cnames, key=length.__getitem__)
+            longest[start] = self._walk(start, length, component)
+
+        loop_chains = {}
+        for members in loops:
+            # The root of the component, the member the search reached first
+            start = members[-1]
+            chain = self._walk(start, length, component)
+            loop_chains[start] = chain + [start] if start in self.cnames[chain[-1]] else chain
+
+        dangling = {}
+        for owner, targets in self.cnames.items():
+            missing = [target for target in targets if target not in self.cnames and target not in self.owners and self._in_account(target)]
+            if missing:
+                dangling[owner] = ", ".join(missing)
+
+        return {
+            "Longest CNAME Chain": longest,
+            "CNAME Loops": loop_chains,
+            "Dangling CNAME Targets": dangling
+        }
+
+class TxtRecords(Analyzer):
+    rrtypes = {"TXT"}
+
+    def __init__(self):
+        self.counts = {"SPF_Count": 0, "DKIM_Count": 0, "DMARC_Count": 0}
+
+    def add(self, zone_name, rrtype, rrsets):
+        for rrset in rrsets:
+            rdata = rrset['rdata']
+            if any("v=spf1" in value for value in rdata):
+                self.counts["SPF_Count"] += 1
+            if any("v=DKIM1" in value for value in rdata):
+                self.counts["DKIM_Count"] += 1
+            if any("v=DMARC1" in value for value in rdata):
+                self.counts["DMARC_Count"] += 1
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] += count
+
+    def result(self, index=None):
+        return dict(self.counts)
+
+class RecordCount(Analyzer):
+    """Count the rrsets of the given record types."""
+
+    def __init__(self, *rrtypes):
+        self.rrtypes = set(rrtypes)
+        self.count = 0
+
+    def add(self, zone_name, rrtype, rrsets):
+        self.count += len(rrsets)
+
+    def merge(self, other):
+        self.count += other.count
+
+    def result(self, index=None):
+        return self.count
+
+def find_owners(zones, names):
+    """Return the names out of names that own an rrset in zones."""
+    found = set()
+    for zone in zones:
+        for rrset in zone.get('rrSets', ()):
+            owner = normalize_name(rrset['ownerName'])
+            if owner in names:
+                found.add(owner)
+    return found
+
+def run_analyzer(analyzer, zones):
+    engine = AuditEngine([analyzer]).feed(zones)
+    return engine.look_up_owners(lambda names: find_owners(zones, names)).result(analyzer)
+
 def record_type_distribution(zones):
-    types = [rrset['rrtype'].split(" ")[0] for zone in zones for rrset in zone['rrSets']]
-    return dict(collections.Counter(types))
+    return run_analyzer(RecordTypeDistribution(), zones)
 
 def subdomain_count(zones):
-    domain_sub_count = {}
-    for zone in zones:
-        domain = zone['zoneName']
-        subdomains = set(rrset['ownerName'] for rrset in zone['rrSets'])
-        domain_sub_count[domain] = len(subdomains) - 1  # Subtract 1 to exclude the main domain
-    return domain_sub_count
+    return run_analyzer(SubdomainCount(), zones)
 
 def deepest_subdomain(zones):
-    all_domains = [rrset['ownerName'] for zone in zones for rrset in zone['rrSets']]
-    return max(all_domains, key=lambda domain: domain.count("."))
+    return run_analyzer(DeepestSubdomain(), zones)
 
 def mx_distribution(zones):
-    mx_records = [rrset for zone in zones for rrset in zone['rrSets'] if rrset['rrtype'].startswith("MX")]
-    mx_servers = [rdata.split()[-1] for mx in mx_records for rdata in mx['rdata']]
-    return dict(collections.Counter(mx_servers))
+    return run_analyzer(MxDistribution(), zones)
 
 def mx_priority_distribution(zones):
-    mx_records = [rrset for zone in zones for rrset in zone['rrSets'] if rrset['rrtype'].startswith("MX")]
-    priorities = [rdata.split()[0] for mx in mx_records for rdata in mx['rdata']]
-    return dict(collections.Counter(priorities))
+    analyzer = MxDistribution()
+    AuditEngine([analyzer]).feed(zones)
+    return analyzer.priority_result()
 
 def cname_chains(zones):
-    cnames = {rrset['ownerName']: rrset['rdata'][0] for zone in zones for rrset in zone['rrSets'] if rrset['rrtype'].startswith("CNAME")}
-    chains = {}
-    for cname, target in cnames.items():
-        chain = [cname]
-        while target in cnames and target not in chain:  # Avoid infinite loops
-            chain.append(target)
-            target = cnames[target]
-        chains[cname] = chain
-    return chains
+    return run_analyzer(CnameChains(), zones)
 
 def longest_cname_chain(zones):
-    chains = cname_chains(zones)
-    longest_chain_domain = max(chains, key=lambda k: len(chains[k]))
-    return {longest_chain_domain: chains[longest_chain_domain]}
+    return cname_chains(zones)["Longest CNAME Chain"]
 
 def txt_records_analysis(zones):
-    txt_records = [rrset for zone in zones for rrset in zone['rrSets'] if rrset['rrtype'].startswith("TXT")]
-    
-    spf_count = sum(1 for record in txt_records if any("v=spf1" in rdata for rdata in record['rdata']))
-    dkim_count = sum(1 for record in txt_records if any("v=DKIM1" in rdata for rdata in record['rdata']))
-    dmarc_count = sum(1 for record in txt_records if any("v=DMARC1" in rdata for rdata in record['rdata']))
+    return run_analyzer(TxtRecords(), zones)
+
+def dnssec_enabled_zones(zones):
+    return run_analyzer(RecordCount("DNSKEY"), zones)
 
+def ipv6_adoption(zones):
+    return run_analyzer(RecordCount("AAAA"), zones)
+
+def report_analyzers():
+    """The analyzers behind generate_audit_report, by name."""
     return {
-        "SPF_Count": spf_count,
-        "DKIM_Count": dkim_count,
-        "DMARC_Count": dmarc_count
+        "general": ZoneTypeCounts(),
+        "types": RecordTypeDistribution(),
+        "subdomains": SubdomainCount(),
+        "deepest": DeepestSubdomain(),
+        "mx": MxDistribution(),
+        "cname": CnameChains(),
+        "txt": TxtRecords(),
+        "dnssec": RecordCount("DNSKEY"),
+        "ipv6": RecordCount("AAAA")
     }
 
-def dnssec_enabled_zones(zones):
-    return sum(1 for zone in zones for rrset in zone['rrSets'] if rrset['rrtype'].startswith("DNSKEY"))
+def _analyze_zones(zones):
+    return AuditEngine(list(report_analyzers().values())).feed(zones)
 
-def ipv6_adoption(zones):
-    return sum(1 for zone in zones for rrset in zone['rrSets'] if rrset['rrtype'].startswith("AAAA"))
+def _analyze_range(path, layout, start, end):
+    return _analyze_zones(iter_zones_in_range(path, layout, start, end))
 
-def generate_audit_report(zones):
-    primary_zone_count = sum(1 for zone in zones if zone['type'] == 'PRIMARY')
-    secondary_zone_count = sum(1 for zone in zones if zone['type'] == 'SECONDARY')
-    alias_zone_count = sum(1 for zone in zones if zone['type'] == 'ALIAS')
-    
-    # Safely compute the total records for zones that have 'rrSets'
-    total_records = sum(len(zone['rrSets']) for zone in zones if 'rrSets' in zone)
+def _find_owners_in_range(path, layout, start, end, names):
+    return find_owners(iter_zones_in_range(path, layout, start, end), names)
+
+def analyze_file(path, jobs=1):
+    """Run the report analyzers over a zones file and return the engine holding their results.
+
+    With more than one job, the file is split into shards analyzed by a pool
+    of processes, and the partial results are merged in file order, so the
+    report is the same as from a single pass. Indented exports written by
+    zexport.py and NDJSON files are split by byte offset, and each process
+    reads its own shard; other files are parsed here and handed out to the
+    processes in chunks of zones. Names the analyzers look up are found in a
+    second pass over the file, split the same way when it can be split by
+    offset.
+    """
+    if jobs <= 1:
+        engine = _analyze_zones(iter_zones(path))
+        return engine.look_up_owners(lambda names: find_owners(iter_zones(path), names))
+
+    engine = AuditEngine(list(report_analyzers().values()))
+    layout = zone_layout(path)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        if layout != "other":
+            shards = shard_ranges(path, jobs * SHARDS_PER_JOB)
+            futures = [executor.submit(_analyze_range, path, layout, start, end) for start, end in shards]
+            for future in futures:
+                engine.merge(future.result())
+
+            def find(names):
+                futures = [executor.submit(_find_owners_in_range, path, layout, start, end, names) for start, end in shards]
+                return set().union(*(future.result() for future in futures))
+        else:
+            for partial in bounded_map(executor, _analyze_zones, batched(iter_zones(path), CHUNK_ZONES), jobs * 2):
+                engine.merge(partial)
+
+            def find(names):
+                # Looking names up is cheap next to parsing, so the processes have nothing to gain here
+                return find_owners(iter_zones(path), names)
+        engine.look_up_owners(find)
+    return engine
+
+def generate_audit_report(zones, engine=None):
+    """Build the audit report from zones, or from an engine already fed them by analyze_file.
+
+    zones may be read twice, so it must be a list rather than an iterator.
+    """
+    if engine is None:
+        engine = _analyze_zones(zones).look_up_owners(lambda names: find_owners(zones, names))
+    analyzers = dict(zip(report_analyzers(), engine.analyzers))
+    results = {name: engine.result(analyzer) for name, analyzer in analyzers.items()}
+
+    general = results["general"]
+    general["Date of Report"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     report = {
-        "General Information": {
-            "Total Zones": len(zones),
-            "Total PRIMARY Zones": primary_zone_count,
-            "Total SECONDARY Zones": secondary_zone_count,
-            "Total ALIAS Zones": alias_zone_count,
-            "Total Records": total_records,
-            "Date of Report": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        },
-        "Record Types Distribution": record_type_distribution([zone for zone in zones if 'rrSets' in zone]),
+        "General Information": general,
+        "Record Types Distribution": results["types"],
         "Domain Analysis": {
-            "Subdomain Count": subdomain_count([zone for zone in zones if 'rrSets' in zone]),
-            "Deepest Subdomain": deepest_subdomain([zone for zone in zones if 'rrSets' in zone])
+            "Subdomain Count": results["subdomains"],
+            "Deepest Subdomain": results["deepest"]
         },
         "MX Records Analysis": {
-            "MX Distribution": mx_distribution([zone for zone in zones if 'rrSets' in zone]),
-            "Priority Distribution": mx_priority_distribution([zone for zone in zones if 'rrSets' in zone])
-        },
-        "CNAME Records Analysis": {
-            "Longest CNAME Chain": longest_cname_chain([zone for zone in zones if 'rrSets' in zone])
+            "MX Distribution": results["mx"],
+            "Priority Distribution": analyzers["mx"].priority_result()
         },
-        "TXT Records Analysis": txt_records_analysis([zone for zone in zones if 'rrSets' in zone]),
+        "CNAME Records Analysis": results["cname"],
+        "TXT Records Analysis": results["txt"],
         "Security Checks": {
-            "DNSSEC Enabled Zones": dnssec_enabled_zones([zone for zone in zones if 'rrSets' in zone])
+            "DNSSEC Enabled Zones": results["dnssec"]
         },
         "Miscellaneous Checks": {
-            "IPv6 Adoption": ipv6_adoption([zone for zone in zones if 'rrSets' in zone])
+            "IPv6 Adoption": results["ipv6"]
         }
     }
     return report
@@ -144,7 +620,7 @@ def generate_html_report(report):
         html_content += "<table>"
 
         for key, value in content.items():
-            if isinstance(value, dict):  # To handle Subdomain Count, MX Distribution, Priority Distribution and Longest CNAME Chain
+            if isinstance(value, dict):  # To handle Subdomain Count, MX Distribution, Priority Distribution and the CNAME analyses
                 html_content += f"<tr><th colspan='2'>{key}</th></tr>"
                 for sub_key, sub_value in value.items():
                     html_content += f"<tr><td>{sub_key}</td><td>{sub_value}</td></tr>"
@@ -170,17 +646,21 @@ if __name__ == "__main__":
     ''', formatter_class=RawTextHelpFormatter)
     
     parser.add_argument('--file', default='zones_data.json', 
-                        help='Path to the JSON file containing DNS zones data. Defaults to "zones_data.json".')
+                        help='Path to the JSON (or newline-delimited .ndjson/.jsonl) file containing DNS zones data. Defaults to "zones_data.json".')
     
     parser.add_argument('--html', action='store_true', 
                         help='If set, outputs the report as an HTML file instead of printing to terminal.')
 
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of processes to analyze the zones with. Defaults to 1.')
+
     args = parser.parse_args()
 
-    with open(args.file, 'r') as file:
-        data = json.load(file)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
 
-    report = generate_audit_report(data['zones'])
+    # Zones are read one at a time, so the export never has to fit in memory
+    report = generate_audit_report(None, engine=analyze_file(args.file, args.jobs))
 
     if args.html:
         html_content = generate_html_report(report)
@@ -1,40 +1,31 @@
 #!/usr/bin/env python3
 
-import json
+import argparse
 import csv
+from zonereader import iter_zones, zone_rows, ColumnarFile, COLUMNAR_EXTENSION
 
-# Load the JSON data
-with open('zones_data.json', 'r') as f:
-    data = json.load(f)
+HEADER = ['Zone Name', 'Zone Type', 'Owner Name', 'TTL', 'Class', 'Record Type', 'Record Data']
 
-# Prepare the CSV data
-csv_data = []
-header = ['Zone Name', 'Zone Type', 'Owner Name', 'TTL', 'Class', 'Record Type', 'Record Data']
-csv_data.append(header)  # Adding header row
+def convert(input_path, output_path):
+    """Write the CSV rows of every zone as each zone is read, without holding the export in memory."""
+    with open(output_path, 'w', newline='') as csvfile:
+        csvwriter = csv.writer(csvfile, delimiter='\t', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csvwriter.writerow(HEADER)
+        if input_path.endswith(COLUMNAR_EXTENSION):
+            # The dataset already holds these rows, column for column
+            with ColumnarFile(input_path) as dataset:
+                csvwriter.writerows(dataset.iter_rows())
+            return
+        for zone in iter_zones(input_path):
+            csvwriter.writerows(zone_rows(zone))
 
-for zone in data['zones']:
-    zone_name = zone['zoneName']
-    zone_type = zone['type']  # Get the zone type
-    # Check if 'rrSets' exists before processing
-    if 'rrSets' in zone:
-        for rrset in zone['rrSets']:
-            owner_name = rrset.get('ownerName', '')
-            rrtype = rrset.get('rrtype', '').split(' ')[0]  # Get just the type e.g., A from "A (1)"
-            ttl = rrset.get('ttl', '')
-            
-            # For each rdata value, we'll create a new CSV row
-            for rdata_value in rrset.get('rdata', []):
-                csv_row = [zone_name, zone_type, owner_name, ttl, 'IN', rrtype, rdata_value]
-                csv_data.append(csv_row)
-    else:
-        # Handle zones without 'rrSets' by adding a row with limited data
-        csv_row = [zone_name, zone_type, 'N/A', 'N/A', 'IN', 'N/A', 'N/A']
-        csv_data.append(csv_row)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a zexport.py JSON export into tab-separated CSV")
+    parser.add_argument("input", nargs="?", default="zones_data.json", help='JSON (or .ndjson/.jsonl, or columnar .zcol) export to convert. Defaults to "zones_data.json".')
+    parser.add_argument("-o", "--output", default="zones_data.csv", help='Path of the CSV file to write. Defaults to "zones_data.csv".')
 
-# Write the CSV data to a file
-with open('zones_data.csv', 'w', newline='') as csvfile:
-    csvwriter = csv.writer(csvfile, delimiter='\t', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-    for row in csv_data:
-        csvwriter.writerow(row)
+    args = parser.parse_args()
 
-print("CSV conversion complete!")
\ No newline at end of file
+    convert(args.input, args.output)
+
+    print("CSV conversion complete!")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import zip_longest
+from zonereader import iter_zones, normalize_name, batched, bounded_map, COLUMNAR_EXTENSION
+
+# Zone pairs per chunk handed to a worker process
+CHUNK_PAIRS = 500
+
+def rrset_key(rrset):
+    """Owner names are compared without regard to case, and record types without the "(1)" suffix."""
+    return normalize_name(rrset.get("ownerName", "")), rrset.get("rrtype", "").split(" ")[0]
+
+def rdata_values(rrtype, rdata, soa_serial=False):
+    """The rdata of an rrset as a sorted tuple, so value order doesn't matter.
+
+    SOA serials are left out unless soa_serial is set, since every change
+    to a zone bumps them.
+    """
+    if rrtype == "SOA" and not soa_serial:
+        rdata = [" ".join(value.split()[:2] + value.split()[3:]) for value in rdata]
+    return tuple(sorted(rdata))
+
+def index_rrsets(zone):
+    """Map (owner, rrtype) to the zone's rrset, merging rrsets that share a key."""
+    index = {}
+    for rrset in zone.get("rrSets", []):
+        key = rrset_key(rrset)
+        if key in index:
+            merged = dict(index[key])
+            merged["rdata"] = index[key].get("rdata", []) + rrset.get("rdata", [])
+            index[key] = merged
+        else:
+            index[key] = rrset
+    return index
+
+def diff_rrset(old, new, rrtype, soa_serial=False):
+    """Return the modification between two rrsets with the same key, or None if they're the same."""
+    old_values = rdata_values(rrtype, old.get("rdata", []), soa_serial)
+    new_values = rdata_values(rrtype, new.get("rdata", []), soa_serial)
+    if old.get("ttl") == new.get("ttl") and old_values == new_values:
+        return None
+    change = {
+        "ownerName": new.get("ownerName"),
+        "rrtype": new.get("rrtype"),
+        "old": {"ttl": old.get("ttl"), "rdata": old.get("rdata", [])},
+        "new": {"ttl": new.get("ttl"), "rdata": new.get("rdata", [])}
+    }
+    if old_values != new_values:
+        old_counts, new_counts = Counter(old.get("rdata", [])), Counter(new.get("rdata", []))
+        change["rdataAdded"] = list((new_counts - old_counts).elements())
+        change["rdataRemoved"] = list((old_counts - new_counts).elements())
+    return change
+
+def diff_zone(old, new, soa_serial=False):
+    """Return the changes between two snapshots of a zone, or None if nothing changed.
+
+    Either snapshot may be None for a zone that was added or removed. The
+    rrsets of both are indexed by (owner, rrtype) and compared key by key.
+    Fields other than rrSets, such as the zone type, web forwards or
+    primary name servers, are compared as a whole.
+    """
+    zone = new if new is not None else old
+    old_index = index_rrsets(old) if old is not None else {}
+    new_index = index_rrsets(new) if new is not None else {}
+
+    added = [rrset for key, rrset in new_index.items() if key not in old_index]
+    removed = [rrset for key, rrset in old_index.items() if key not in new_index]
+    modified = []
+    for key, rrset in new_index.items():
+        if key in old_index:
+            change = diff_rrset(old_index[key], rrset, key[1], soa_serial)
+            if change:
+                modified.append(change)
+
+    attributes = {}
+    if old is not None and new is not None:
+        for field in sorted((set(old) | set(new)) - {"zoneName", "rrSets"}):
+            if old.get(field) != new.get(field):
+                attributes[field] = {"old": old.get(field), "new": new.get(field)}
+
+    if old is not None and new is not None and not (added or removed or modified or attributes):
+        return None
+    result = {"zoneName": zone["zoneName"], "change": "added" if old is None else "removed" if new is None else "modified"}
+    rrsets = {name: value for name, value in (("added", added), ("removed", removed), ("modified", modified)) if value}
+    if rrsets:
+        result["rrSets"] = rrsets
+    if attributes:
+        result["attributes"] = attributes
+    return result
+
+def _diff_chunk(pairs, soa_serial):
+    return [change for change in (diff_zone(old, new, soa_serial) for old, new in pairs) if change]
+
+def pair_zones(old_zones, new_zones):
+    """Yield (old, new) for every zone in either snapshot, with None for the side a zone is missing from.
+
+    Both snapshots are read at the same pace, and a zone is held only until
+    its counterpart turns up, so exports that list zones in (roughly) the
+    same order are paired in a single streaming pass. Zones found in only
+    one snapshot are yielded once both have been read.
+    """
+    unmatched_old, unmatched_new = {}, {}
+    for old, new in zip_longest(old_zones, new_zones):
+        if old is not None:
+            name = normalize_name(old["zoneName"])
+            if name in unmatched_new:
+                yield old, unmatched_new.pop(name)
+            else:
+                unmatched_old[name] = old
+        if new is not None:
+            name = normalize_name(new["zoneName"])
+            if name in unmatched_old:
+                yield unmatched_old.pop(name), new
+            else:
+                unmatched_new[name] = new
+    for old in unmatched_old.values():
+        yield old, None
+    for new in unmatched_new.values():
+        yield None, new
+
+def iter_changes(old_path, new_path, jobs=1, soa_serial=False, old_header=None, new_header=None):
+    """Yield the changes of every zone that differs between two exports.
+
+    With more than one job, zone pairs are diffed in chunks by a pool of
+    processes; changes are still yielded in the order the zones were paired.
+    """
+    pairs = pair_zones(iter_zones(old_path, old_header), iter_zones(new_path, new_header))
+    if jobs <= 1:
+        for old, new in pairs:
+            change = diff_zone(old, new, soa_serial)
+            if change:
+                yield change
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for changes in bounded_map(executor, partial(_diff_chunk, soa_serial=soa_serial), batched(pairs, CHUNK_PAIRS), jobs * 2):
+            yield from changes
+
+def write_changeset(old_path, new_path, out, jobs=1, soa_serial=False):
+    """Write the changeset between two exports to out as JSON and return its summary.
+
+    Each changed zone is written on its own line as soon as it has been
+    diffed, followed by the exports' headers and the summary counts.
+    """
+    old_header, new_header = {}, {}
+    summary = Counter()
+    out.write('{"zones": [')
+    for count, change in enumerate(iter_changes(old_path, new_path, jobs, soa_serial, old_header, new_header)):
+        out.write(",\n" if count else "\n")
+        out.write(json.dumps(change))
+        summary[f"zones_{change['change']}"] += 1
+        for name, rrsets in change.get("rrSets", {}).items():
+            summary[f"rrsets_{name}"] += len(rrsets)
+    summary = {key: summary[key] for key in ["zones_added", "zones_removed", "zones_modified", "rrsets_added", "rrsets_removed", "rrsets_modified"]}
+    out.write(f'\n], "old": {json.dumps(old_header)}, "new": {json.dumps(new_header)}, "summary": {json.dumps(summary)}}}\n')
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two zexport.py JSON exports and write the added, removed and modified rrsets as JSON")
+    parser.add_argument("old", help="The earlier export (JSON, .ndjson/.jsonl, or columnar .zcol to compare with another .zcol)")
+    parser.add_argument("new", help="The later export")
+    parser.add_argument("-o", "--output", help="Path of the JSON changeset to write. Defaults to standard output.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes to compare zones with. Defaults to 1.")
+    parser.add_argument("--soa-serial", action="store_true", help="Report SOA records whose serial is the only change")
+
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    if args.old.endswith(COLUMNAR_EXTENSION) != args.new.endswith(COLUMNAR_EXTENSION):
+        # Anything else would show up as changed
+        parser.error("A .zcol dataset only stores zone names, types and rrsets, so it can only be compared with another .zcol dataset.")
+
+    started = time.monotonic()
+    if args.output:
+        with open(args.output, "w") as out:
+            summary = write_changeset(args.old, args.new, out, args.jobs, args.soa_serial)
+    else:
+        summary = write_changeset(args.old, args.new, sys.stdout, args.jobs, args.soa_serial)
+    print(f"{summary['zones_added']} zone(s) added, {summary['zones_removed']} removed, {summary['zones_modified']} modified; "
+          f"{summary['rrsets_added']} rrset(s) added, {summary['rrsets_removed']} removed, {summary['rrsets_modified']} modified "
+          f"in {time.monotonic() - started:.1f}s", file=sys.stderr)
+    # Like diff, exit with 1 when the exports differ
+    sys.exit(1 if any(summary.values()) else 0)
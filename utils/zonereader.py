@@ -0,0 +1,335 @@
+import collections
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+CHUNK_SIZE = 1024 * 1024
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+COLUMNAR_EXTENSION = ".zcol"
+COLUMNAR_MAGIC = b"ZCOL1"
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+class _Buffer:
+    """Text read from a file in chunks, consumed from the front with raw_decode."""
+
+    def __init__(self, f):
+        self.f = f
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read more of the file, doubling the read size with the pending text so large values parse in linear time."""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(CHUNK_SIZE, len(self.text) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or "" at the end of the file."""
+        while True:
+            self.pos = _whitespace.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in zone data, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value, reading more of the file until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+def iter_zones(path, header=None):
+    """Yield the zones of a zexport JSON file one at a time.
+
+    Reads the {"username", "timestamp", "zones": [...]} document written by
+    zexport.py (indented or compact) without loading it whole, so memory use
+    is bounded by the largest zone. Files ending in .ndjson or .jsonl are read
+    as one JSON object per line instead; lines without a zoneName are treated
+    as header lines. Columnar .zcol datasets are rebuilt into zones with
+    zoneName, type and rrSets (ownerName, ttl, bare rrtype and rdata only).
+    Top-level fields other than the zones are stored in header, if a dict is
+    given.
+    """
+    if header is None:
+        header = {}
+    if path.endswith(NDJSON_EXTENSIONS):
+        yield from _iter_ndjson(path, header)
+        return
+    if path.endswith(COLUMNAR_EXTENSION):
+        yield from _iter_columnar(path, header)
+        return
+
+    with open(path, "r") as f:
+        buffer = _Buffer(f)
+        buffer.expect("{")
+        if buffer.peek() == "}":
+            return
+        while True:
+            key = buffer.value()
+            buffer.expect(":")
+            if key == "zones":
+                buffer.expect("[")
+                if buffer.peek() == "]":
+                    buffer.pos += 1
+                else:
+                    while True:
+                        yield buffer.value()
+                        if buffer.peek() == "]":
+                            buffer.pos += 1
+                            break
+                        buffer.expect(",")
+            else:
+                header[key] = buffer.value()
+            if buffer.peek() == "}":
+                return
+            buffer.expect(",")
+
+def _iter_ndjson(path, header):
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "zoneName" in record:
+                yield record
+            else:
+                header.update(record)
+
+# zexport.py's indented writer puts every zone object at exactly this
+# indentation, and everything nested inside a zone deeper, so these markers
+# only ever match zone boundaries.
+_ZONE_START = b"\n        {"
+_ZONE_END = b"\n        }"
+_INDENTED_HEADER = re.compile(rb'^\{\n    "[^\n]*\n(    "[^\n]*\n)*    "zones": \[(\n        \{|\])')
+
+def zone_layout(path):
+    """Return how zones can be located in a file without parsing it.
+
+    "ndjson" files have one zone per line and "indented" files were written
+    by zexport.py with indentation. Anything else is "other" and can only be
+    read in order with iter_zones.
+    """
+    if path.endswith(NDJSON_EXTENSIONS):
+        return "ndjson"
+    with open(path, "rb") as f:
+        head = f.read(CHUNK_SIZE)
+    return "indented" if _INDENTED_HEADER.match(head) else "other"
+
+def shard_ranges(path, count):
+    """Split a file into count byte ranges to be read independently with iter_zones_in_range."""
+    size = os.path.getsize(path)
+    bounds = [size * index // count for index in range(count + 1)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def iter_zones_in_range(path, layout, start, end):
+    """Yield the zones of an "indented" or "ndjson" file that begin within [start, end).
+
+    Reading every range of shard_ranges this way yields each zone exactly once.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if layout == "ndjson":
+            # A line belongs to the range its first byte falls in
+            pos = 0 if start == 0 else data.find(b"\n", start - 1) + 1
+            while 0 <= pos < end and (pos or start == 0):
+                line_end = data.find(b"\n", pos)
+                if line_end == -1:
+                    line_end = len(data)
+                line = data[pos:line_end]
+                if line.strip():
+                    record = json.loads(line)
+                    if "zoneName" in record:
+                        yield record
+                pos = line_end + 1
+            return
+
+        pos = data.find(_ZONE_START, start)
+        while pos != -1 and pos < end:
+            zone_start = pos + len(_ZONE_START) - 1
+            zone_end = data.find(_ZONE_END, zone_start) + len(_ZONE_END)
+            yield json.loads(data[zone_start:zone_end])
+            pos = data.find(_ZONE_START, zone_end)
+
+def normalize_name(name):
+    """Lowercase a domain name and give it exactly one trailing dot."""
+    return name.lower().rstrip(".") + "."
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable, without reading ahead of the current batch."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def bounded_map(executor, fn, iterable, window):
+    """Like executor.map, but never runs more than window calls ahead of the consumer.
+
+    Results are yielded in input order, and at most window of them are held in
+    memory at any time, so a file being read into iterable keeps streaming.
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def zone_rows(zone):
+    """Yield the rows of a single zone, one per rdata value, as csvgen.py writes them and the columnar dataset stores them."""
+    zone_name = zone['zoneName']
+    zone_type = zone['type']  # Get the zone type
+    # Check if 'rrSets' exists before processing
+    if 'rrSets' in zone:
+        for rrset in zone['rrSets']:
+            owner_name = rrset.get('ownerName', '')
+            rrtype = rrset.get('rrtype', '').split(' ')[0]  # Get just the type e.g., A from "A (1)"
+            ttl = rrset.get('ttl', '')
+
+            # For each rdata value, we'll create a new CSV row
+            for rdata_value in rrset.get('rdata', []):
+                yield [zone_name, zone_type, owner_name, ttl, 'IN', rrtype, rdata_value]
+    else:
+        # Handle zones without 'rrSets' by adding a row with limited data
+        yield [zone_name, zone_type, 'N/A', 'N/A', 'IN', 'N/A', 'N/A']
+
+class ColumnarFile:
+    """Reader for the columnar .zcol datasets written by zexport.py --columnar.
+
+    Only the chunks of the columns asked for are read and decompressed, one
+    row group at a time. Columns are zone_name, zone_type, owner_name, ttl,
+    class, rrtype and rdata, matching the columns of csvgen.py. Zones that
+    have no rows are listed in empty_zones as [rows before the zone, zone
+    name, zone type].
+    """
+
+    def __init__(self, path):
+        self.f = open(path, "rb")
+        tail_size = len(COLUMNAR_MAGIC) + 8
+        if self.f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar zone dataset")
+        self.f.seek(-tail_size, os.SEEK_END)
+        tail = self.f.read(tail_size)
+        if tail[8:] != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is incomplete, its footer is missing")
+        footer_size = struct.unpack("<Q", tail[:8])[0]
+        self.f.seek(-tail_size - footer_size, os.SEEK_END)
+        footer = json.loads(self.f.read(footer_size))
+        self.header = footer["header"]
+        self.encodings = {column["name"]: column["encoding"] for column in footer["columns"]}
+        self.columns = list(self.encodings)
+        self.dictionaries = footer["dictionaries"]
+        self.rows = footer["rows"]
+        self.row_groups = footer["row_groups"]
+        self.empty_zones = footer.get("empty_zones", [])
+        self.swap = footer["byteorder"] != sys.byteorder
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def _integers(self, data):
+        values = array("I")
+        values.frombytes(data)
+        if self.swap:
+            values.byteswap()
+        return values
+
+    def read_column(self, row_group, name):
+        """Return the values of one column in a row group as a list."""
+        offset, length = row_group["columns"][name]
+        self.f.seek(offset)
+        data = zlib.decompress(self.f.read(length))
+        if self.encodings[name] == "dict":
+            return list(map(self.dictionaries[name].__getitem__, self._integers(data)))
+        split = row_group["rows"] * 4
+        blob = data[split:]
+        ends = list(accumulate(self._integers(data[:split])))
+        text = blob.decode("utf-8")
+        if len(text) == len(blob):
+            # All ASCII, so byte offsets are character offsets and one decode does
+            return list(map(text.__getitem__, map(slice, [0] + ends, ends)))
+        return [blob[start:end].decode("utf-8") for start, end in zip([0] + ends, ends)]
+
+    def iter_row_groups(self, columns=None):
+        """Yield a {column: values} dict for each row group, reading only the given columns."""
+        columns = columns or self.columns
+        for row_group in self.row_groups:
+            yield {name: self.read_column(row_group, name) for name in columns}
+
+    def iter_rows(self, columns=None):
+        """Yield each row as a tuple of the given columns' values."""
+        columns = columns or self.columns
+        for group in self.iter_row_groups(columns):
+            yield from zip(*(group[name] for name in columns))
+
+def _iter_columnar(path, header):
+    with ColumnarFile(path) as dataset:
+        header.update(dataset.header)
+        empty_zones = collections.deque(dataset.empty_zones)
+        zone = rrset = None
+        rows = dataset.iter_rows(["zone_name", "zone_type", "owner_name", "ttl", "rrtype", "rdata"])
+        for row, (zone_name, zone_type, owner_name, ttl, rrtype, rdata) in enumerate(rows):
+            while empty_zones and empty_zones[0][0] == row:
+                if zone is not None:
+                    yield zone
+                    zone = None
+                _, empty_name, empty_type = empty_zones.popleft()
+                yield {"zoneName": empty_name, "type": empty_type, "rrSets": []}
+            if zone is None or zone_name != zone["zoneName"]:
+                if zone is not None:
+                    yield zone
+                zone = {"zoneName": zone_name, "type": zone_type}
+                rrset = None
+                # csvgen's placeholder row for zones without rrsets
+                if owner_name == rrtype == rdata == "N/A":
+                    continue
+                zone["rrSets"] = []
+            if rrset is None or owner_name != rrset["ownerName"] or rrtype != rrset["rrtype"] or ttl != rrset.get("ttl", ""):
+                rrset = {"ownerName": owner_name, "rrtype": rrtype, "rdata": []}
+                # Rows of rrsets without a TTL hold ""
+                if ttl != "":
+                    rrset["ttl"] = ttl
+                zone["rrSets"].append(rrset)
+            rrset["rdata"].append(rdata)
+        if zone is not None:
+            yield zone
+        for _, empty_name, empty_type in empty_zones:
+            yield {"zoneName": empty_name, "type": empty_type, "rrSets": []}
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+
+HEADER = ['Zone Name', 'Owner Name', 'TTL', 'Record Type', 'Record Data']
+
+RECORDS = """
+    SELECT zones.name, rrsets.owner, rrsets.ttl, rrsets.rrtype, rdata.value
+    FROM rdata
+    JOIN rrsets ON rrsets.id = rdata.rrset_id
+    JOIN zones ON zones.id = rrsets.zone_id
+"""
+ORDER = " ORDER BY zones.name, rrsets.owner, rrsets.rrtype, rdata.position"
+
+def fqdn(name):
+    """Names are stored with a trailing dot; add it if the user left it off."""
+    return name if name.endswith(".") else name + "."
+
+def record_query(conditions, params, rrtype=None):
+    if rrtype:
+        conditions.append("rrsets.rrtype = ?")
+        params.append(rrtype.upper())
+    return RECORDS + " WHERE " + " AND ".join(conditions) + ORDER, params
+
+def build_query(args):
+    """Return the SQL, parameters and column names for a subcommand."""
+    if args.command == "rdata":
+        if args.contains:
+            return record_query(["instr(rdata.value, ?) > 0"], [args.value], args.type) + (HEADER,)
+        return record_query(["rdata.value = ?"], [args.value], args.type) + (HEADER,)
+    if args.command == "owner":
+        return record_query(["rrsets.owner = ?"], [fqdn(args.name)], args.type) + (HEADER,)
+    if args.command == "zone":
+        return record_query(["zones.name = ?"], [fqdn(args.name)], args.type) + (HEADER,)
+    if args.command == "forwards":
+        sql = ("SELECT zones.name, web_forwards.request_to, web_forwards.redirect_to, web_forwards.forward_type "
+               "FROM web_forwards JOIN zones ON zones.id = web_forwards.zone_id")
+        params = []
+        if args.to:
+            sql += " WHERE instr(web_forwards.redirect_to, ?) > 0"
+            params.append(args.to)
+        return sql + " ORDER BY zones.name, web_forwards.request_to", params, ['Zone Name', 'Request To', 'Redirect To', 'Forward Type']
+    return args.query, [], None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the SQLite zone store written by zexport.py --sqlite")
+    parser.add_argument("--db", default="zones.db", help='Path of the SQLite database. Defaults to "zones.db".')
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rdata_parser = subparsers.add_parser("rdata", help="Records whose data is VALUE, e.g. which zones point at an IP")
+    rdata_parser.add_argument("value")
+    rdata_parser.add_argument("--contains", action="store_true", help="Match records whose data contains VALUE instead (not indexed, slower)")
+    rdata_parser.add_argument("-t", "--type", help="Only records of this type, e.g. TXT")
+
+    owner_parser = subparsers.add_parser("owner", help="Records at an owner name")
+    owner_parser.add_argument("name")
+    owner_parser.add_argument("-t", "--type", help="Only records of this type")
+
+    zone_parser = subparsers.add_parser("zone", help="Every record in a zone")
+    zone_parser.add_argument("name")
+    zone_parser.add_argument("-t", "--type", help="Only records of this type")
+
+    forwards_parser = subparsers.add_parser("forwards", help="Web forwards")
+    forwards_parser.add_argument("--to", help="Only forwards whose destination contains this text")
+
+    sql_parser = subparsers.add_parser("sql", help="Run any read-only SQL query against the store")
+    sql_parser.add_argument("query")
+
+    args = parser.parse_args()
+
+    try:
+        db = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    except sqlite3.OperationalError as e:
+        parser.error(f"Unable to open {args.db}: {e}")
+
+    sql, params, header = build_query(args)
+    started = time.monotonic()
+    cursor = db.execute(sql, params)
+    writer = csv.writer(sys.stdout, delimiter='\t', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+    writer.writerow(header or [column[0] for column in cursor.description])
+    count = 0
+    for row in cursor:
+        writer.writerow(row)
+        count += 1
+    print(f"{count} row(s) in {(time.monotonic() - started) * 1000:.1f} ms", file=sys.stderr)